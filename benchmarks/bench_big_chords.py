@@ -0,0 +1,58 @@
+#! /usr/bin/python
+"""
+Acquire and release chords requesting many resources of the same class from a large pool.
+"""
+from __future__ import print_function
+import argparse, os, sys, timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from chords import registry
+from chords.chord import Chord
+from chords.pool import Pool
+from chords.resource import Resource
+
+
+class Worker(object):
+    pass
+
+
+def measure(pool_size, chord_size, mode, number):
+    pool = Pool()
+    for _ in range(pool_size):
+        pool.add(Resource(Worker))
+    registry.register(Worker, pool)
+    try:
+        def acquire_release():
+            chord = Chord()
+            if mode == 'counted':
+                chord.request_many(Worker, chord_size, True)
+            else:
+                for i in range(chord_size):
+                    # Resource.matches ignores kwargs, so distinct requests still match every worker
+                    if mode == 'distinct':
+                        chord.request(Worker, True, slot=i)
+                    else:
+                        chord.request(Worker, True)
+            assert chord.acquire()
+            chord.release()
+        return min(timeit.repeat(acquire_release, number=number, repeat=3)) / number
+    finally:
+        registry.unregister(Worker)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--pool-size', type=int, default=2000)
+    parser.add_argument('--chord-size', type=int, default=64)
+    parser.add_argument('--number', type=int, default=20)
+    args = parser.parse_args()
+
+    for mode in ('equal', 'distinct', 'counted'):
+        seconds = measure(args.pool_size, args.chord_size, mode, args.number)
+        print('{} {} requests over {} resources: {:10.1f}us per acquire/release'.format(
+            args.chord_size, mode, args.pool_size, seconds * 1e6))
+
+
+if __name__ == '__main__':
+    main()
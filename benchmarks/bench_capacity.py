@@ -0,0 +1,60 @@
+#! /usr/bin/python
+"""
+Hosts with CPU slots, modeled as one resource per slot or as one resource per host with a capacity:
+time to acquire and release a slot on a given host.
+"""
+from __future__ import print_function
+import argparse, os, sys, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from chords import registry
+from chords.chord import Chord
+from chords.pool import Pool
+from chords.resource import Resource
+
+
+class Host(Resource):
+    def __init__(self, name, capacity=None):
+        super(Host, self).__init__(Host, capacity)
+        self.name = name
+
+    def matches(self, request):
+        return self.cls == request.cls and request.name == self.name
+
+
+def measure(pool, hosts, iterations):
+    registry.register(Host, pool)
+    try:
+        start = time.perf_counter()
+        for i in range(iterations):
+            chord = Chord()
+            chord.request(Host, name=i % hosts, units=1)
+            with chord:
+                pass
+        return (time.perf_counter() - start) / iterations
+    finally:
+        registry.unregister(Host)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--hosts', type=int, default=100)
+    parser.add_argument('--slots', type=int, default=32)
+    parser.add_argument('--iterations', type=int, default=2000)
+    args = parser.parse_args()
+
+    per_slot = Pool()
+    for name in range(args.hosts):
+        for _ in range(args.slots):
+            per_slot.add(Host(name))
+    with_capacity = Pool()
+    for name in range(args.hosts):
+        with_capacity.add(Host(name, capacity=args.slots))
+
+    for label, pool in (('slot resources', per_slot), ('capacity', with_capacity)):
+        print('{:>15}: {:8.1f}us per acquire and release'.format(label, measure(pool, args.hosts, args.iterations) * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+#! /usr/bin/python
+"""
+Cost of handing a released resource to a waiting chord, while many other chords wait on an unrelated pool.
+Incremental fairness only retries the chords waiting on the released pool, instead of rescanning the whole queue.
+Sharded fairness keeps the chords of each pool in their own queue, so even non incremental policies don't see the other pool's chords.
+"""
+from __future__ import print_function
+import argparse, os, sys, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from chords import registry
+from chords import fairness_policies as fairness
+from chords.chord import Chord
+from chords.pool import Pool
+from chords.resource import Resource
+
+
+class Busy(object):
+    pass
+
+
+class Cycled(object):
+    pass
+
+
+class FullRescanFairness(fairness.BestEffortFairness):
+    INCREMENTAL = False
+
+
+def _exclusive_chord(cls):
+    chord = Chord()
+    chord.request(cls, True)
+    return chord
+
+
+POLICIES = [
+    ('FullRescanFairness', FullRescanFairness),
+    ('BestEffortFairness', fairness.BestEffortFairness),
+    ('ExclusiveBlocks', fairness.ExclusiveResourceBlocksFairness),
+    ('Sharded ExclusiveBlocks', lambda: fairness.ShardedFairness(fairness.ExclusiveResourceBlocksFairness)),
+]
+
+
+def measure(policy_factory, backlog, rounds):
+    for cls in (Busy, Cycled):
+        pool = Pool()
+        pool.add(Resource(cls))
+        registry.register(cls, pool)
+    old_policy = fairness._fairness
+    policy = policy_factory()
+    fairness.set_fairness_policy(policy)
+    try:
+        busy_holder = _exclusive_chord(Busy)
+        assert busy_holder.acquire()
+        for _ in range(backlog):
+            policy.add(_exclusive_chord(Busy))
+        policy.try_acquire_chords()
+
+        holder = _exclusive_chord(Cycled)
+        assert holder.acquire()
+        elapsed = 0
+        for _ in range(rounds):
+            waiter = _exclusive_chord(Cycled)
+            policy.add(waiter)
+            policy.try_acquire_chords()
+            start = time.perf_counter()
+            holder.release()
+            policy.try_acquire_chords()
+            elapsed += time.perf_counter() - start
+            assert waiter.is_satisfied()
+            holder = waiter
+        holder.release()
+        return elapsed / rounds
+    finally:
+        fairness.set_fairness_policy(old_policy)
+        registry.unregister(Busy)
+        registry.unregister(Cycled)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--backlog', type=int, nargs='+', default=[10, 1000, 10000], help='Chords waiting on a busy pool')
+    parser.add_argument('--rounds', type=int, default=20)
+    args = parser.parse_args()
+
+    for backlog in args.backlog:
+        for name, policy_factory in POLICIES:
+            seconds = measure(policy_factory, backlog, args.rounds)
+            print('{:>24} {:>6} waiting chords: {:10.1f}us per handoff'.format(name, backlog, seconds * 1e6))
+
+
+if __name__ == '__main__':
+    main()
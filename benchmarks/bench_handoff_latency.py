@@ -0,0 +1,77 @@
+#! /usr/bin/python
+"""
+Latency from releasing a resource until a chord waiting for it in another thread enters its block.
+Compares polling waits with notification based waits, with and without time based iterations.
+"""
+from __future__ import print_function
+import argparse, os, sys, threading, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from chords import registry, waiters
+from chords import fairness_policies as fairness
+from chords.chord import Chord
+from chords.pool import Pool
+from chords.resource import Resource
+
+
+class Slot(object):
+    pass
+
+
+def _exclusive_chord():
+    chord = Chord()
+    chord.request(Slot, True)
+    return chord
+
+
+def measure(rounds):
+    latencies = []
+    for _ in range(rounds):
+        holder = _exclusive_chord()
+        assert holder.acquire()
+        entered_at = []
+        def run():
+            with _exclusive_chord():
+                entered_at.append(time.perf_counter())
+        thread = threading.Thread(target=run)
+        thread.start()
+        while not fairness.has_waiting_chords():
+            time.sleep(0.0001)
+        released_at = time.perf_counter()
+        holder.release()
+        thread.join()
+        latencies.append(entered_at[0] - released_at)
+    latencies.sort()
+    return latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rounds', type=int, default=200)
+    parser.add_argument('--poll-interval', type=float, default=0.01, help='Sleep between polls of the polling waiter')
+    args = parser.parse_args()
+
+    modes = [
+        ('polling', waiters.PollingWaiter(sleep_seconds=args.poll_interval), fairness.ITERATION_MINIMUM),
+        ('condition', waiters.ConditionWaiter(), fairness.ITERATION_MINIMUM),
+        ('condition, state driven', waiters.ConditionWaiter(), None),
+    ]
+    pool = Pool()
+    pool.add(Resource(Slot))
+    registry.register(Slot, pool)
+    old_policy = fairness._fairness
+    try:
+        for name, waiter, iteration_minimum in modes:
+            waiters.set_waiter(waiter)
+            fairness.set_fairness_policy(fairness.BestEffortFairness(iteration_minimum=iteration_minimum))
+            p50, p99 = measure(args.rounds)
+            print('{:<24} handoff p50 {:8.3f}ms p99 {:8.3f}ms'.format(name, p50 * 1000, p99 * 1000))
+    finally:
+        waiters.set_waiter(waiters.PollingWaiter())
+        fairness.set_fairness_policy(old_policy)
+        registry.unregister(Slot)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+#! /usr/bin/python
+"""
+Compare chord acquisition against a plain Pool and an IndexedPool of hosts, with equality requests.
+"""
+from __future__ import print_function
+import argparse, os, sys, timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from chords import registry
+from chords.chord import Chord
+from chords.pool import Pool, IndexedPool
+from chords.request import Request
+from chords.resource import Resource
+
+ZONES = 10
+KINDS = 4
+
+
+class Host(Resource):
+    def __init__(self, index):
+        super(Host, self).__init__(Host)
+        self.index = index
+        self.zone = index % ZONES
+        self.kind = index % KINDS
+
+    def matches(self, request):
+        return (self.cls == request.cls and
+                all(getattr(self, k, None) == v for k, v in request.kwargs.items()))
+
+
+def measure(pool, size, busy_fraction, number):
+    hosts = [Host(i) for i in range(size)]
+    for host in hosts:
+        pool.add(host)
+    registry.register(Host, pool)
+    try:
+        busy = Request(Host, True)
+        for host in hosts[:int(size * busy_fraction)]:
+            host.acquire(busy)
+
+        def acquire_release():
+            chord = Chord()
+            chord.request(Host, True, zone=ZONES - 1, kind=KINDS - 1)
+            assert chord.acquire()
+            chord.release()
+        return min(timeit.repeat(acquire_release, number=number, repeat=3)) / number
+    finally:
+        registry.unregister(Host)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--busy', type=float, default=0.9, help='Fraction of hosts held exclusively')
+    parser.add_argument('--number', type=int, default=20)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        for name, pool in [('Pool', Pool()), ('IndexedPool', IndexedPool(['zone', 'kind', 'index']))]:
+            seconds = measure(pool, size, args.busy, args.number)
+            print('{:>12} {:>7} hosts: {:10.1f}us per acquire/release'.format(name, size, seconds * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+#! /usr/bin/python
+"""
+Metrics overhead on acquiring and releasing a single exclusive resource: metrics disabled, and measured
+into a MemorySink (wait and hold times, acquire attempts and resource busy time on every chord).
+"""
+from __future__ import print_function
+import argparse, os, sys, timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from chords import metrics, registry
+from chords.chord import Chord
+from chords.pool import Pool
+from chords.resource import Resource
+
+
+class Slot(object):
+    pass
+
+
+def measure(number):
+    def acquire_release():
+        chord = Chord()
+        chord.request(Slot, True)
+        with chord:
+            pass
+    return min(timeit.repeat(acquire_release, number=number, repeat=5)) / number
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--number', type=int, default=20000)
+    args = parser.parse_args()
+
+    pool = Pool()
+    pool.add(Resource(Slot))
+    registry.register(Slot, pool)
+
+    print('{:>12}: {:8.2f}us per chord'.format('disabled', measure(args.number) * 1e6))
+    sink = metrics.enable()
+    print('{:>12}: {:8.2f}us per chord'.format('memory sink', measure(args.number) * 1e6))
+    metrics.set_sink(None)
+    print(sink.get_histogram('chord.hold_seconds').summary())
+
+
+if __name__ == '__main__':
+    main()
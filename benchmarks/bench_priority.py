@@ -0,0 +1,78 @@
+#! /usr/bin/python
+"""
+Mixed workload on a few exclusive resources: many batch threads and a few latency critical threads, which
+run with a higher priority. Prints how long each kind waited for the resources under each fairness policy.
+"""
+from __future__ import print_function
+import argparse, os, sys, threading, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from chords import registry, waiters
+from chords import fairness_policies as fairness
+from chords.chord import Chord
+from chords.pool import Pool
+from chords.resource import Resource
+
+
+class Slot(object):
+    pass
+
+
+def measure(batch_threads, critical_threads, hold_seconds, duration):
+    waits = dict(batch=[], critical=[])
+    deadline = time.time() + duration
+
+    def run(kind, priority):
+        while time.time() < deadline:
+            chord = Chord(priority=priority)
+            chord.request(Slot, True)
+            start = time.perf_counter()
+            with chord:
+                waits[kind].append(time.perf_counter() - start)
+                time.sleep(hold_seconds)
+            if kind == 'critical':
+                time.sleep(hold_seconds * 2)
+
+    threads = [threading.Thread(target=run, args=('batch', 0)) for _ in range(batch_threads)]
+    threads += [threading.Thread(target=run, args=('critical', 10)) for _ in range(critical_threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return dict((kind, sorted(kind_waits)) for kind, kind_waits in waits.items())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--resources', type=int, default=2)
+    parser.add_argument('--batch-threads', type=int, default=16)
+    parser.add_argument('--critical-threads', type=int, default=2)
+    parser.add_argument('--hold', type=float, default=0.0005, help='Seconds each chord holds its resource')
+    parser.add_argument('--duration', type=float, default=1)
+    args = parser.parse_args()
+
+    policies = [fairness.BestEffortFairness, fairness.StrictFIFOFairness, fairness.ExclusiveResourceBlocksFairness, fairness.PriorityFairness]
+    pool = Pool()
+    for _ in range(args.resources):
+        pool.add(Resource(Slot))
+    registry.register(Slot, pool)
+    old_policy = fairness._fairness
+    waiters.set_waiter(waiters.ConditionWaiter())
+    try:
+        for policy_class in policies:
+            fairness.set_fairness_policy(policy_class(iteration_minimum=None))
+            waits = measure(args.batch_threads, args.critical_threads, args.hold, args.duration)
+            for kind in ('critical', 'batch'):
+                kind_waits = waits[kind]
+                print('{:<32} {:<8} {:6} runs  wait p50 {:8.3f}ms p99 {:8.3f}ms max {:8.3f}ms'.format(
+                    policy_class.__name__, kind, len(kind_waits), kind_waits[len(kind_waits) // 2] * 1000,
+                    kind_waits[int(len(kind_waits) * 0.99)] * 1000, kind_waits[-1] * 1000))
+    finally:
+        waiters.set_waiter(waiters.PollingWaiter())
+        fairness.set_fairness_policy(old_policy)
+        registry.unregister(Slot)
+
+
+if __name__ == '__main__':
+    main()
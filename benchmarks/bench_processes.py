@@ -0,0 +1,57 @@
+#! /usr/bin/python
+"""
+Cross-process acquire/release throughput of shared memory resources (chords.more.multiprocess),
+with several processes acquiring one of a few exclusive resources in a loop.
+"""
+from __future__ import print_function
+import argparse, multiprocessing, os, sys, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from chords import registry, waiters
+from chords.chord import Chord
+from chords.more.multiprocess import SharedState, SharedPool, SharedResource, SharedWaiter
+
+
+class Device(SharedResource):
+    def __init__(self, name):
+        super(Device, self).__init__(Device)
+        self.name = name
+
+
+def worker(iterations):
+    for _ in range(iterations):
+        chord = Chord()
+        chord.request(Device, True)
+        with chord:
+            pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--processes', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--resources', type=int, default=4)
+    parser.add_argument('--iterations', type=int, default=5000)
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context('fork')
+    state = SharedState(args.resources, context)
+    pool = SharedPool(state)
+    for name in range(args.resources):
+        pool.add(Device(name))
+    registry.register(Device, pool)
+    waiters.set_waiter(SharedWaiter(state))
+
+    for processes in args.processes:
+        workers = [context.Process(target=worker, args=(args.iterations,)) for _ in range(processes)]
+        start = time.perf_counter()
+        for process in workers:
+            process.start()
+        for process in workers:
+            process.join()
+        elapsed = time.perf_counter() - start
+        print('{:>3} processes: {:10.0f} acquire/release per second'.format(processes, processes * args.iterations / elapsed))
+
+
+if __name__ == '__main__':
+    main()
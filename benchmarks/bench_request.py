@@ -0,0 +1,80 @@
+#! /usr/bin/python
+"""
+Request creation, hashing and matching cost, compared to the OrderedDict based requests,
+and the cost of keying a set by many requests that differ only in their values.
+"""
+from __future__ import print_function
+import argparse, os, sys, timeit
+from collections import OrderedDict
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from chords.request import Request
+from chords.resource import Resource
+
+
+class LegacyRequest(object):
+    count = 1
+
+    def __init__(self, cls, exclusive=False, **kwargs):
+        self.cls = cls
+        self.kwargs = OrderedDict(sorted(kwargs.items(), key=lambda x:x[0]))
+        self._exclusive = exclusive
+
+    def is_exclusive(self):
+        return self._exclusive
+
+    def is_shared(self):
+        return not self._exclusive
+
+    def __getattribute__(self, k):
+        try:
+            return object.__getattribute__(self, k)
+        except AttributeError:
+            return self.kwargs.get(k)
+
+    def __eq__(self, o):
+        if not isinstance(o, LegacyRequest):
+            return False
+        return self.cls == o.cls and self.kwargs == o.kwargs
+
+    def __hash__(self):
+        return hash((self.cls,) + tuple(self.kwargs.keys()))
+
+
+class Host(Resource):
+    def __init__(self, name):
+        super(Host, self).__init__(Host)
+        self.name = name
+
+    def matches(self, request):
+        return self.cls == request.cls and request.name == self.name
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--number', type=int, default=200000)
+    parser.add_argument('--keys', type=int, default=2000, help="Number of distinct requests in the keyed set")
+    args = parser.parse_args()
+
+    host = Host('a')
+    for request_class in (LegacyRequest, Request):
+        request = request_class(Host, name='a', rack=3)
+        other = request_class(Host, rack=3, name='a')
+        cases = [
+            ('create', lambda: request_class(Host, name='a', rack=3)),
+            ('hash', lambda: hash(request)),
+            ('equal', lambda: request == other),
+            ('match', lambda: host.matches(request)),
+            ('can_acquire', lambda: host.can_acquire(request)),
+        ]
+        for name, func in cases:
+            seconds = min(timeit.repeat(func, number=args.number, repeat=3))
+            print('{:>13} {:>12}: {:8.1f}ns'.format(request_class.__name__, name, seconds / args.number * 1e9))
+        requests = [request_class(Host, name=str(i)) for i in range(args.keys)]
+        seconds = min(timeit.repeat(lambda: set(requests), number=1, repeat=3))
+        print('{:>13} {:>12}: {:8.1f}ms for {} requests'.format(request_class.__name__, 'keyed set', seconds * 1000, args.keys))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+#! /usr/bin/python
+"""
+Cost of a fairness iteration over a backlog of chords waiting on a saturated pool,
+compared to scanning every resource of the pool as pools used to.
+"""
+from __future__ import print_function
+import argparse, os, sys, timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from chords import registry
+from chords import fairness_policies as fairness
+from chords.chord import Chord
+from chords.exceptions import UnsatisfiableRequestError
+from chords.pool import Pool
+from chords.request import Request
+from chords.resource import Resource
+
+
+class Worker(object):
+    pass
+
+
+class LinearScanPool(Pool):
+    """
+    Scan all resources on every find, without tracking which are free
+    """
+    def find(self, request):
+        found = False
+        for resource in self.all():
+            if resource.matches(request):
+                found = True
+                if resource.can_acquire(request):
+                    yield resource
+
+        if not found:
+            raise UnsatisfiableRequestError("No resources can match request {}".format(request))
+
+
+def measure(pool, pool_size, backlog, number):
+    resources = [Resource(Worker) for _ in range(pool_size)]
+    for resource in resources:
+        pool.add(resource)
+    registry.register(Worker, pool)
+    policy = fairness.BestEffortFairness()
+    old_policy = fairness._fairness
+    fairness.set_fairness_policy(policy)
+    try:
+        held = Request(Worker, True)
+        for resource in resources:
+            resource.acquire(held)
+        for _ in range(backlog):
+            chord = Chord()
+            chord.request(Worker, True)
+            policy.add(chord)
+        def iteration():
+            # Retry every waiting chord, as incremental iterations only retry new chords and chords of released pools
+            policy.notify_release()
+            policy._check_chords()
+        return min(timeit.repeat(iteration, number=number, repeat=3)) / number
+    finally:
+        fairness.set_fairness_policy(old_policy)
+        registry.unregister(Worker)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--pool-size', type=int, default=1000)
+    parser.add_argument('--backlog', type=int, default=1000, help='Number of waiting chords')
+    parser.add_argument('--number', type=int, default=5)
+    args = parser.parse_args()
+
+    for name, pool in [('LinearScanPool', LinearScanPool()), ('Pool', Pool())]:
+        seconds = measure(pool, args.pool_size, args.backlog, args.number)
+        print('{:>15}: {:10.2f}ms per iteration over {} chords waiting on {} busy resources'.format(
+            name, seconds * 1000, args.backlog, args.pool_size))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,35 @@
+#! /usr/bin/python
+"""
+Acquiring and releasing a resource shared by many holders at once, e.g. a read-shared dataset.
+Holders release in random order.
+"""
+from __future__ import print_function
+import argparse, os, random, sys, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from chords.request import Request
+from chords.resource import Resource
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--holders', type=int, nargs='+', default=[100, 1000, 10000])
+    args = parser.parse_args()
+
+    for holders in args.holders:
+        resource = Resource(Resource)
+        requests = [Request(Resource, job=i) for i in range(holders)]
+        released = list(requests)
+        random.shuffle(released)
+        start = time.perf_counter()
+        for request in requests:
+            resource.acquire(request)
+        for request in released:
+            resource.release(request)
+        elapsed = time.perf_counter() - start
+        print('{:>6} holders: {:8.2f}us per acquire and release'.format(holders, elapsed / holders * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+#! /usr/bin/python
+"""
+Per-call overhead of a @requires task, compared to introspecting the target and replaying
+requirement dicts on every call as tasks used to.
+"""
+from __future__ import print_function
+import argparse, inspect, os, sys, timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from chords import registry
+from chords.chord import Chord
+from chords.pool import Pool
+from chords.resource import Resource
+from chords.task import Task, TaskFactory, requires
+
+
+class LegacyTask(Task):
+    def _get_run_args(self, resources, args):
+        argnames = inspect.getfullargspec(self._run)[0]
+        is_method = (argnames and 'self' == argnames[0])
+        resource_index = 1 if is_method else 0
+        if 'resources' in argnames[resource_index:resource_index + 1]:
+            if is_method:
+                return (args[0], resources) + args[1:]
+            return (resources,) + args[1:]
+        return args
+
+
+class LegacyTaskFactory(TaskFactory):
+    def add_requirement(self, cls, exclusive, **kwargs):
+        self._requirements.append(dict(cls=cls, exclusive=exclusive, kwargs=kwargs))
+
+    def __call__(self, *args, **kwargs):
+        task = LegacyTask(self._func, name=self.__name__)
+        resources = Chord()
+        for requirement in self._requirements:
+            resources.request(requirement['cls'], requirement['exclusive'], **requirement['kwargs'])
+        return task.start(resources=resources, *args, **kwargs)
+
+
+class Slot(Resource):
+    def __init__(self, name):
+        super(Slot, self).__init__(Slot)
+        self.name = name
+
+    def matches(self, request):
+        return self.cls == request.cls and request.name in (None, self.name)
+
+
+def run(resources):
+    return resources
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--number', type=int, default=20000)
+    args = parser.parse_args()
+
+    pool = Pool()
+    for name in ('a', 'b', 'c'):
+        pool.add(Slot(name))
+    registry.register(Slot, pool)
+
+    for factory_class in (LegacyTaskFactory, TaskFactory):
+        func = factory_class(run)
+        for name in ('a', 'b', 'c'):
+            func = requires(Slot, name=name)(func)
+        seconds = min(timeit.repeat(func, number=args.number, repeat=3))
+        print('{:>18}: {:8.1f}us per call'.format(factory_class.__name__, seconds / args.number * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+#! /usr/bin/python
+"""
+Running tasks with dynamic names (e.g. per job), with an unbounded and a bounded task pool:
+time per task and the number of names left in the pool.
+"""
+from __future__ import print_function
+import argparse, os, sys, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from chords import registry
+from chords.task import Task, TaskPool
+
+
+def measure(pool, tasks):
+    registry.unregister(Task)
+    registry.register(Task, pool)
+    start = time.perf_counter()
+    for i in range(tasks):
+        Task(lambda: None, name='job-{}'.format(i)).start()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--tasks', type=int, default=50000)
+    parser.add_argument('--max-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    for name, pool in (('unbounded', TaskPool()), ('max_size={}'.format(args.max_size), TaskPool(max_size=args.max_size))):
+        elapsed = measure(pool, args.tasks)
+        stats = pool.get_stats()
+        print('{:>15}: {:6.1f}us per task, {:>7} names left, {:>7} evicted'.format(
+            name, elapsed / args.tasks * 1e6, stats['size'], stats['evictions']))
+
+
+if __name__ == '__main__':
+    main()
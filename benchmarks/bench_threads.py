@@ -0,0 +1,84 @@
+#! /usr/bin/python
+"""
+Chord throughput from multiple threads, comparing locking granularity:
+    own pools     each thread acquires resources of its own class, locking only that class's pool
+    global lock   the same, but every pool shares one lock, as if the registry had a single global lock
+    shared pool   all threads acquire resources of one class, from one pool with a resource per thread
+Resources aren't held by default (--hold 0), so the measurement is of locking and scheduling, not of sleeping.
+"""
+from __future__ import print_function
+import argparse, os, sys, threading, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from chords import registry, waiters
+from chords.chord import Chord
+from chords.pool import Pool
+from chords.resource import Resource
+
+
+def _make_classes(count, mode):
+    if mode == 'shared pool':
+        cls = type('Device', (object,), {})
+        pool = Pool()
+        for _ in range(count):
+            pool.add(Resource(cls))
+        registry.register(cls, pool)
+        return [cls] * count
+    classes = []
+    lock = threading.RLock()
+    for i in range(count):
+        cls = type('Device{}'.format(i), (object,), {})
+        pool = Pool()
+        if mode == 'global lock':
+            pool.lock = lock
+        pool.add(Resource(cls))
+        registry.register(cls, pool)
+        classes.append(cls)
+    return classes
+
+
+MODES = ['own pools', 'global lock', 'shared pool']
+
+
+def measure(thread_count, duration, hold_seconds, mode):
+    classes = _make_classes(thread_count, mode)
+    counts = [0] * thread_count
+    deadline = time.time() + duration
+
+    def run(index):
+        cls = classes[index]
+        while time.time() < deadline:
+            chord = Chord()
+            chord.request(cls, True)
+            with chord:
+                if hold_seconds:
+                    time.sleep(hold_seconds)
+            counts[index] += 1
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(thread_count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for cls in set(classes):
+        registry.unregister(cls)
+    return sum(counts) / duration
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    parser.add_argument('--duration', type=float, default=1.0, help='Seconds to run each measurement')
+    parser.add_argument('--hold', type=float, default=0, help='Seconds each chord holds its resources')
+    args = parser.parse_args()
+
+    waiters.set_waiter(waiters.ConditionWaiter())
+    for mode in MODES:
+        for thread_count in args.threads:
+            rate = measure(thread_count, args.duration, args.hold, mode)
+            print('{:<12} {:>3} threads: {:10.0f} acquires/sec'.format(mode, thread_count, rate))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+#! /usr/bin/python
+"""
+Chords waiting with a timeout on a resource held by a stuck holder: how late they time out, and whether any are
+left in the fairness queue afterwards. Also the cost of a timeout on acquiring and releasing a free resource.
+"""
+from __future__ import print_function
+import argparse, os, sys, threading, time, timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from chords import metrics, registry, waiters
+from chords import fairness_policies as fairness
+from chords.chord import Chord
+from chords.exceptions import AcquireTimeoutError
+from chords.pool import Pool
+from chords.resource import Resource
+
+
+class Slot(object):
+    pass
+
+
+def measure_pile_up(threads, timeout):
+    holder = Chord()
+    holder.request(Slot, True)
+    assert holder.acquire()
+    overshoots = []
+
+    def run():
+        chord = Chord(timeout=timeout)
+        chord.request(Slot, True)
+        start = time.time()
+        try:
+            with chord:
+                pass
+        except AcquireTimeoutError:
+            overshoots.append(time.time() - start - timeout)
+
+    workers = [threading.Thread(target=run) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    left = len(list(fairness.get_fairness_policy()))
+    holder.release()
+    return sorted(overshoots), left
+
+
+def measure_free(timeout, number):
+    def acquire_release():
+        chord = Chord(timeout=timeout)
+        chord.request(Slot, True)
+        with chord:
+            pass
+    return min(timeit.repeat(acquire_release, number=number, repeat=5)) / number
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--threads', type=int, default=100)
+    parser.add_argument('--timeout', type=float, default=0.05)
+    parser.add_argument('--number', type=int, default=20000)
+    args = parser.parse_args()
+
+    pool = Pool()
+    pool.add(Resource(Slot))
+    registry.register(Slot, pool)
+    sink = metrics.enable()
+    try:
+        for name, waiter in (('polling', waiters.PollingWaiter(sleep_seconds=0.001)), ('condition', waiters.ConditionWaiter())):
+            waiters.set_waiter(waiter)
+            overshoots, left = measure_pile_up(args.threads, args.timeout)
+            print('{:<10} {} timeouts, overshoot p50 {:6.2f}ms p99 {:6.2f}ms, {} chords left waiting'.format(
+                name, len(overshoots), overshoots[len(overshoots) // 2] * 1000, overshoots[int(len(overshoots) * 0.99)] * 1000, left))
+        print('timeouts counted: {}'.format(sink.get_counter('chord.timeouts', policy='BestEffortFairness')))
+        metrics.set_sink(None)
+        waiters.set_waiter(waiters.PollingWaiter())
+        for timeout in (None, 60):
+            print('free resource, timeout={}: {:6.2f}us per chord'.format(timeout, measure_free(timeout, args.number) * 1e6))
+    finally:
+        metrics.set_sink(None)
+        waiters.set_waiter(waiters.PollingWaiter())
+        registry.unregister(Slot)
+
+
+if __name__ == '__main__':
+    main()
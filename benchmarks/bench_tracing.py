@@ -0,0 +1,65 @@
+#! /usr/bin/python
+"""
+Tracing overhead on acquiring and releasing a large chord: tracing disabled, a structured tracer that
+only counts events, and debug logging (which formats every event, as was always done before) to a handler that drops it.
+"""
+from __future__ import print_function
+import argparse, logging, os, sys, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from chords import registry, tracing
+from chords.chord import Chord
+from chords.pool import IndexedPool
+from chords.resource import Resource
+
+
+class Disk(Resource):
+    def __init__(self, name):
+        super(Disk, self).__init__(Disk)
+        self.name = name
+
+    def matches(self, request):
+        return self.cls == request.cls and request.name == self.name
+
+
+def measure(requests, iterations):
+    chord = Chord()
+    for i in range(requests):
+        chord.request(Disk, True, name=i)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        with chord:
+            pass
+    return (time.perf_counter() - start) / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--iterations', type=int, default=200)
+    args = parser.parse_args()
+
+    pool = IndexedPool(('name',))
+    for i in range(args.requests):
+        pool.add(Disk(i))
+    registry.register(Disk, pool)
+
+    logger = logging.getLogger('Chords')
+    logger.addHandler(logging.NullHandler())
+    logger.propagate = False
+    counts = {}
+
+    def count(event, fields):
+        counts[event] = counts.get(event, 0) + 1
+
+    print('{:>12}: {:8.2f}ms per chord'.format('disabled', measure(args.requests, args.iterations) * 1000))
+    tracing.set_tracer(count)
+    print('{:>12}: {:8.2f}ms per chord'.format('tracer', measure(args.requests, args.iterations) * 1000))
+    tracing.set_tracer(None)
+    logger.setLevel(logging.DEBUG)
+    print('{:>12}: {:8.2f}ms per chord'.format('debug log', measure(args.requests, args.iterations) * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+#! /usr/bin/python
+"""
+Compare the polling and notification based wait modes of Chord.__enter__:
+CPU burned by blocked chords while nothing is released, and latency from release to acquire.
+"""
+from __future__ import print_function
+import argparse, os, sys, threading, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from chords import registry, waiters
+from chords.chord import Chord
+from chords.pool import Pool
+from chords.resource import Resource
+
+
+class Slot(object):
+    pass
+
+
+def _setup():
+    pool = Pool()
+    pool.add(Resource(Slot))
+    registry.register(Slot, pool)
+
+
+def _teardown():
+    registry.unregister(Slot)
+
+
+def measure_idle_cpu(waiter_count, idle_seconds):
+    holder = Chord()
+    holder.request(Slot, True)
+    assert holder.acquire()
+
+    threads = []
+    for _ in range(waiter_count):
+        chord = Chord()
+        chord.request(Slot, True)
+        def run(chord=chord):
+            with chord:
+                pass
+        thread = threading.Thread(target=run)
+        thread.daemon = True
+        thread.start()
+        threads.append(thread)
+    time.sleep(0.1) # let everyone block
+
+    cpu_start = time.process_time()
+    time.sleep(idle_seconds)
+    cpu_used = time.process_time() - cpu_start
+
+    holder.release()
+    for thread in threads:
+        thread.join()
+    return cpu_used / idle_seconds
+
+
+def measure_handoff_latency(rounds):
+    latencies = []
+    for _ in range(rounds):
+        holder = Chord()
+        holder.request(Slot, True)
+        assert holder.acquire()
+        acquired_at = []
+        chord = Chord()
+        chord.request(Slot, True)
+        def run():
+            with chord:
+                acquired_at.append(time.perf_counter())
+        thread = threading.Thread(target=run)
+        thread.daemon = True
+        thread.start()
+        time.sleep(0.01)
+        released_at = time.perf_counter()
+        holder.release()
+        thread.join()
+        latencies.append(acquired_at[0] - released_at)
+    latencies.sort()
+    return latencies[len(latencies) // 2], latencies[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--waiters', type=int, default=100, help='Number of blocked chords')
+    parser.add_argument('--idle', type=float, default=2.0, help='Seconds to measure idle CPU')
+    parser.add_argument('--rounds', type=int, default=10, help='Release/acquire handoffs to measure')
+    parser.add_argument('--poll-interval', type=float, default=0.01, help='Sleep between polls of the polling waiter')
+    args = parser.parse_args()
+
+    modes = [
+        ('polling', waiters.PollingWaiter(sleep_seconds=args.poll_interval)),
+        ('condition', waiters.ConditionWaiter()),
+    ]
+    _setup()
+    try:
+        for name, waiter in modes:
+            waiters.set_waiter(waiter)
+            cpu = measure_idle_cpu(args.waiters, args.idle)
+            p50, worst = measure_handoff_latency(args.rounds)
+            print('{:<10} idle cpu {:6.1%} with {} waiters, handoff p50 {:8.3f}ms max {:8.3f}ms'.format(
+                name, cpu, args.waiters, p50 * 1000, worst * 1000))
+    finally:
+        waiters.set_waiter(waiters.PollingWaiter())
+        _teardown()
+
+
+if __name__ == '__main__':
+    main()
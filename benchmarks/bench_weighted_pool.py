@@ -0,0 +1,91 @@
+#! /usr/bin/python
+"""
+WeightedRandomPool draw cost: the first draw (what a chord usually needs) and draining the whole pool,
+compared to rebuilding the cumulative sum on every draw as the pool used to,
+and to NumPy batch scoring when NumPy is installed.
+"""
+from __future__ import print_function
+import argparse, bisect, os, random, sys, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from chords.pool import WeightedRandomPool
+from chords.request import Request
+from chords.resource import Resource
+try:
+    from chords.more.numpy_scoring import batch_score
+except ImportError:
+    batch_score = None
+
+
+class Node(Resource):
+    def __init__(self, load):
+        super(Node, self).__init__(Node)
+        self.load = load
+
+
+class LegacyWeightedRandomPool(WeightedRandomPool):
+    def find(self, request):
+        resources = self.all()
+        score_method = request.score_method or (lambda _: 1)
+        scores = [max(score_method(resource), 0) for resource in resources]
+        while resources:
+            cum_scores = []
+            s = 0
+            for score in scores:
+                s += score
+                cum_scores.append(s)
+            i = bisect.bisect_left(cum_scores, random.random() * cum_scores[-1])
+            resource = resources.pop(i)
+            del scores[i]
+            if resource.matches(request) and resource.can_acquire(request):
+                yield resource
+
+
+def _score(node):
+    return 1.0 / (1 + node.load)
+
+
+if batch_score is not None:
+    @batch_score('load')
+    def _batch_score(loads):
+        return 1.0 / (1 + loads)
+
+
+def measure(pool_class, size, drain, score_method=_score):
+    pool = pool_class()
+    for _ in range(size):
+        pool.add(Node(random.randint(0, 100)))
+    start = time.perf_counter()
+    draws = pool.find(Request(Node, score_method=score_method))
+    if drain:
+        for _ in draws:
+            pass
+    else:
+        next(draws)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 10000, 100000])
+    parser.add_argument('--legacy-drain-max', type=int, default=10000, help="Largest pool to drain with the legacy quadratic pool")
+    args = parser.parse_args()
+
+    cases = [('legacy', LegacyWeightedRandomPool, _score), ('per resource', WeightedRandomPool, _score)]
+    if batch_score is not None:
+        cases.append(('numpy batch', WeightedRandomPool, _batch_score))
+
+    for size in args.sizes:
+        for name, pool_class, score_method in cases:
+            first = measure(pool_class, size, False, score_method)
+            if pool_class is LegacyWeightedRandomPool and size > args.legacy_drain_max:
+                drain = 'skipped'
+            else:
+                drain = '{:10.1f}ms'.format(measure(pool_class, size, True, score_method) * 1000)
+            print('{:>14} {:>7} resources: first draw {:10.1f}ms, drain {}'.format(
+                name, size, first * 1000, drain))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+#! /usr/bin/python
+"""
+Run the benchmark suite: pool scans, chord acquire/release throughput, fairness handoff latency under
+contention for each fairness policy, and WeightedRandomPool draws. Results are written as JSON, and may be
+compared to the results of another run (e.g. of a previous version) with --compare.
+"""
+from __future__ import print_function
+import argparse, json, os, platform, sys, threading, time, timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import bench_big_chords, bench_indexed_pool, bench_weighted_pool
+from chords import registry, waiters
+from chords import fairness_policies as fairness
+from chords.__version__ import __version__
+from chords.chord import Chord
+from chords.pool import Pool, IndexedPool, WeightedRandomPool
+from chords.resource import Resource
+
+POLICIES = [fairness.BestEffortFairness, fairness.StrictFIFOFairness, fairness.ExclusiveResourceBlocksFairness, fairness.PriorityFairness]
+
+
+class Slot(object):
+    pass
+
+
+def _result(benchmark, params, metric, value, unit):
+    return dict(benchmark=benchmark, params=params, metric=metric, value=value, unit=unit)
+
+
+def pool_scan(scale):
+    for size in (1000 * scale, 10000 * scale):
+        for pool_class in (Pool, IndexedPool):
+            pool = pool_class() if pool_class is Pool else pool_class(('zone', 'kind'))
+            seconds = bench_indexed_pool.measure(pool, size, 0.9, 20)
+            yield _result('pool_scan', dict(pool=pool_class.__name__, size=size, busy=0.9), 'acquire_release', seconds * 1e6, 'us')
+
+
+def chord_throughput(scale):
+    pool = Pool()
+    pool.add(Resource(Slot))
+    registry.register(Slot, pool)
+    try:
+        def acquire_release():
+            chord = Chord()
+            chord.request(Slot, True)
+            with chord:
+                pass
+        number = 2000 * scale
+        seconds = min(timeit.repeat(acquire_release, number=number, repeat=3)) / number
+        yield _result('chord_throughput', dict(requests=1), 'rate', 1 / seconds, 'per_second')
+    finally:
+        registry.unregister(Slot)
+    for mode in ('equal', 'distinct', 'counted'):
+        seconds = bench_big_chords.measure(2000, 64, mode, 20)
+        yield _result('chord_throughput', dict(requests=64, mode=mode, pool_size=2000), 'rate', 1 / seconds, 'per_second')
+
+
+def _contended_waits(threads, resources, duration):
+    """
+    Threads acquire one of a few exclusive resources in a loop. Returns the time each acquisition waited
+    """
+    pool = Pool()
+    for _ in range(resources):
+        pool.add(Resource(Slot))
+    registry.register(Slot, pool)
+    waits = []
+    deadline = time.time() + duration
+
+    def run():
+        while time.time() < deadline:
+            chord = Chord()
+            chord.request(Slot, True)
+            start = time.perf_counter()
+            with chord:
+                waits.append(time.perf_counter() - start)
+                time.sleep(0.0005)
+
+    try:
+        workers = [threading.Thread(target=run) for _ in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+    finally:
+        registry.unregister(Slot)
+    return sorted(waits)
+
+
+def fairness_handoff(scale):
+    old_waiter, old_policy = waiters.get_waiter(), fairness._fairness
+    waiters.set_waiter(waiters.ConditionWaiter())
+    try:
+        for policy_class in POLICIES:
+            fairness.set_fairness_policy(policy_class(iteration_minimum=None))
+            waits = _contended_waits(8, 2, 0.5 * scale)
+            params = dict(policy=policy_class.__name__, threads=8, resources=2)
+            yield _result('fairness_handoff', params, 'wait_p50', waits[len(waits) // 2] * 1000, 'ms')
+            yield _result('fairness_handoff', params, 'wait_p99', waits[int(len(waits) * 0.99)] * 1000, 'ms')
+            yield _result('fairness_handoff', params, 'rate', len(waits) / (0.5 * scale), 'per_second')
+    finally:
+        waiters.set_waiter(old_waiter)
+        fairness.set_fairness_policy(old_policy)
+
+
+def weighted_draws(scale):
+    for size in (1000 * scale, 10000 * scale):
+        for drain in (False, True):
+            seconds = bench_weighted_pool.measure(WeightedRandomPool, size, drain)
+            yield _result('weighted_draws', dict(size=size), 'drain' if drain else 'first_draw', seconds * 1000, 'ms')
+
+
+BENCHMARKS = [pool_scan, chord_throughput, fairness_handoff, weighted_draws]
+
+
+def _key(result):
+    return (result['benchmark'], json.dumps(result['params'], sort_keys=True), result['metric'])
+
+
+def compare(results, old_results):
+    old = dict((_key(result), result['value']) for result in old_results)
+    for result in results:
+        previous = old.get(_key(result))
+        ratio = '' if not previous else '{:8.2f}x'.format(result['value'] / previous)
+        print('{:<18} {:<80} {:<12} {:12.3f} {:<10} {}'.format(
+            result['benchmark'], json.dumps(result['params'], sort_keys=True), result['metric'], result['value'], result['unit'], ratio))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--only', nargs='+', choices=[benchmark.__name__ for benchmark in BENCHMARKS], help='Benchmarks to run')
+    parser.add_argument('--scale', type=int, default=1, help='Multiply sizes and durations')
+    parser.add_argument('--output', help='Write the results to this file instead of stdout')
+    parser.add_argument('--compare', help='Results of a previous run, to print the ratio of each result to')
+    args = parser.parse_args()
+
+    results = []
+    for benchmark in BENCHMARKS:
+        if args.only is None or benchmark.__name__ in args.only:
+            results.extend(benchmark(args.scale))
+    report = dict(
+        version=__version__,
+        python=platform.python_version(),
+        platform=platform.platform(),
+        time=time.time(),
+        results=results,
+    )
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2)
+    elif not args.compare:
+        print(json.dumps(report, indent=2))
+    if args.compare:
+        with open(args.compare) as previous:
+            compare(results, json.load(previous)['results'])
+
+
+if __name__ == '__main__':
+    main()
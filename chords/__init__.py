@@ -1,6 +1,6 @@
 from .task import Task, task, requires
 from .chord import Chord
 from .resource import Resource
-from .pool import Pool, RandomPool
+from .pool import Pool, RandomPool, IndexedPool
 from .request import Request
-from .exceptions import UnsatisfiedResourcesError
+from .exceptions import UnsatisfiedResourcesError, AcquireTimeoutError
@@ -1,42 +1,147 @@
-import waiting, itertools, logging, sys
+import itertools, sys, threading, time
+from collections import OrderedDict
 from six import reraise
-from .exceptions import UnsatisfiedResourcesError
+from .exceptions import AcquireTimeoutError, UnsatisfiedResourcesError, UnknownResourceClassError
 from .request import Request
 from . import fairness_policies as fairness
+from . import metrics
 from . import registry
+from . import tracing
+from . import waiters
 
-_logger = logging.getLogger('Chords')
+try:
+    from contextvars import ContextVar
+except ImportError: # Python 2, and Python 3 before 3.7
+    ContextVar = None
 
-class Chord(object):
+
+class _LocalDeadline(threading.local):
+    """
+    Stand-in for a ContextVar, local to each thread (and greenlet, once gevent patches threading).
+    Tokens may be reset in any order: the deadline is the latest one set by a token that wasn't reset.
+    """
     def __init__(self):
+        self._tokens = []
+
+    def get(self):
+        return self._tokens[-1][0] if self._tokens else None
+
+    def set(self, value):
+        token = [value]
+        self._tokens.append(token)
+        return token
+
+    def reset(self, token):
+        for index, other in enumerate(self._tokens):
+            if other is token:
+                del self._tokens[index]
+                return
+
+
+# Greenlets and asyncio tasks each have their own context, so interleaved tasks don't see each other's deadlines
+_deadline = _LocalDeadline() if ContextVar is None else ContextVar('chords_deadline', default=None)
+
+def get_deadline():
+    """
+    Deadline of chords entered by this thread or greenlet, set while it is in the block of a chord with a deadline
+    (not a timeout). A time.time() timestamp, or None if there is none.
+    """
+    return _deadline.get()
+
+
+class Chord(object):
+    def __init__(self, priority=0, timeout=None, deadline=None):
+        """
+        Chords with a higher priority get resources first, if the fairness policy is a PriorityFairness.
+
+        Entering the chord raises AcquireTimeoutError if its resources weren't acquired within timeout seconds,
+        or by deadline (a time.time() timestamp). timeout only limits acquiring this chord, while deadline also
+        limits chords entered within its block, e.g. by subtasks.
+        """
+        self._priority = priority
+        self._timeout = timeout
+        self._deadline = deadline
+        self._deadline_token = None
+        self._abandoned = False
         self._requests = []
+        self._request_groups = None
         self._resources = None
         self._error = None
+        self._lock = threading.RLock()
+        self._waiting_since = None
+        self._acquired_at = None
+
+    def get_priority(self):
+        return self._priority
+
+    def set_priority(self, priority):
+        """
+        Takes effect the next time the chord starts waiting
+        """
+        self._priority = priority
 
     def request(self, cls, exclusive=False, **kwargs):
         self._requests.append(Request(cls, exclusive, **kwargs))
+        self._request_groups = None
+
+    def add_requests(self, requests):
+        """
+        Add existing requests. Requests are immutable, so the same requests may be added to many chords.
+        """
+        self._requests.extend(requests)
+        self._request_groups = None
+
+    def request_many(self, cls, count, exclusive=False, **kwargs):
+        """
+        Request count different resources matching the same arguments.
+        They are found together in a single pass over the pool, and get returns them as a list.
+        """
+        if count < 1:
+            raise ValueError('Expected a positive count, got {}'.format(count))
+        request = Request(cls, exclusive, **kwargs)
+        request.count = count
+        self._requests.append(request)
+        self._request_groups = None
 
     def get(self, cls, **kwargs):
-        resources = self.find(cls, **kwargs)
-        if len(resources) == 0:
+        """
+        Return the single resource matching the arguments, or the list of resources of a request_many if they all match
+        """
+        items = self._find_items(cls, **kwargs)
+        if len(items) == 0:
             raise UnsatisfiedResourcesError("Resource {} {} not found in {}".format(cls, kwargs, self))
-        if len(resources) > 1:
+        request = items[0][0]
+        if request.count > 1 and all(item_request is request for item_request, _ in items):
+            return [resource for _, resource in items]
+        if len(items) > 1:
             raise UnsatisfiedResourcesError("Too many values match {} {} in {}".format(cls, kwargs, self))
-        return resources[0]
+        return items[0][1]
 
     def find(self, cls, **kwargs):
+        return [resource for _, resource in self._find_items(cls, **kwargs)]
+
+    def _find_items(self, cls, **kwargs):
         if not self.is_satisfied():
             raise UnsatisfiedResourcesError("Resource context not satisfied")
         if not cls in self._resources:
             raise UnsatisfiedResourcesError("Resource context does not contain resources for {}".format(cls))
 
         res = []
-        request = Request(cls, **kwargs)
-        for resource in self._resources[cls].values():
-            if resource.matches(request):
-                res.append(resource)
+        request = self._find_request(cls, kwargs)
+        for item in self._resources[cls]:
+            if item[1].matches(request):
+                res.append(item)
         return res
 
+    def _find_request(self, cls, kwargs):
+        """
+        The chord's own request of cls with these arguments, so finding resources doesn't create a request
+        """
+        for request, _ in self._resources[cls]:
+            if request.units == 1 and request.kwargs == kwargs:
+                return request
+        return Request(cls, **kwargs)
+
     def is_satisfied(self):
         return self._resources is not None
 
@@ -47,10 +152,28 @@ class Chord(object):
         Returns:
             True if successful, False otherwise
         """
-        if self.is_satisfied() or self._acquire():
-            fairness.remove_chord(self)
-            return True
-        return False
+        with self._lock:
+            if self.is_satisfied():
+                acquired = True
+            else:
+                acquired = self._acquire()
+                if metrics.enabled():
+                    policy = type(fairness.get_fairness_policy()).__name__
+                    metrics.increment('chord.acquire_attempts', policy=policy)
+                    if not acquired:
+                        metrics.increment('chord.acquire_failures', policy=policy)
+            if acquired:
+                fairness.remove_chord(self)
+            return acquired
+
+    def _acquire_waiting(self):
+        """
+        Try acquire for a fairness iteration, unless the chord timed out since the iteration started
+        """
+        with self._lock:
+            if self._abandoned:
+                return False
+            return self.acquire()
 
     def _acquire(self):
         """
@@ -61,47 +184,105 @@ class Chord(object):
             True if successful, False otherwise
         """
         resources = {}
+        groups = self._get_request_groups()
+        traced = tracing.enabled()
 
-        # Get available resources
-        for request in self._requests:
-            cls_resources = resources.setdefault(request.cls, {})
-            found = False
-            for resource in registry.find_resources(request):
-                if resource not in cls_resources.values():
-                    cls_resources[request] = resource
-                    _logger.debug('Found {} for {}'.format(resource, request))
-                    found = True
-                    break
-            if not found:
-                _logger.debug("Can't acquire {} because resource for {} was not found".format(self, request))
-                return False
+        with registry.locked_pools(groups):
+            # Get available resources, finding all resources for equal requests in a single pass over the pool
+            for cls, cls_groups in groups.items():
+                cls_resources = resources[cls] = []
+                taken = set()
+                pool = registry.get_pool(cls)
+                for requests in cls_groups:
+                    count = sum(request.count for request in requests)
+                    found = pool.find_many(requests[0], count, taken)
+                    if len(found) < count:
+                        if traced:
+                            tracing.trace('not_found', "Can't acquire {chord} because resource for {request} was not found", chord=self, request=requests[0])
+                        return False
+                    if traced:
+                        tracing.trace('found', 'Found {resources} for {request}', resources=found, request=requests[0])
+                    cls_resources.extend(zip(self._expand(requests), found))
 
-        # acquire
-        _logger.debug('Acquire {} for {}'.format(resources, self))
-        for request, resource in self._items(resources):
-            resource.acquire(request)
+            # acquire
+            if traced:
+                tracing.trace('acquire', 'Acquire {resources} for {chord}', resources=resources, chord=self)
+            for request, resource in self._items(resources):
+                resource.acquire(request)
 
         self._resources = resources
+        if metrics.enabled():
+            self._acquired_at = metrics.now()
+            if self._waiting_since is not None:
+                metrics.observe('chord.wait_seconds', self._acquired_at - self._waiting_since)
+        self._waiting_since = None
         return True
 
+    def _get_request_groups(self):
+        """
+        Requests grouped by class, and equal requests grouped together
+        """
+        if self._request_groups is None:
+            groups = {}
+            for request in self._requests:
+                cls_groups = groups.setdefault(request.cls, OrderedDict())
+                cls_groups.setdefault((request.is_exclusive(), request), []).append(request)
+            self._request_groups = dict((cls, list(cls_groups.values())) for cls, cls_groups in groups.items())
+        return self._request_groups
+
+    def _expand(self, requests):
+        """
+        Repeat each request by its count, to pair requests with the resources found for them
+        """
+        return itertools.chain.from_iterable(itertools.repeat(request, request.count) for request in requests)
+
     def release(self):
-        if self.is_satisfied():
-            for request, resource in self._items(self._resources):
-                resource.release(request)
-            _logger.debug('Release {} from {}'.format(self._resources, self))
-        self._resources = None
+        with self._lock:
+            if not self.is_satisfied():
+                return
+            with registry.locked_pools(self._resources):
+                for request, resource in self._items(self._resources):
+                    resource.release(request)
+            if tracing.enabled():
+                tracing.trace('release', 'Release {resources} from {chord}', resources=self._resources, chord=self)
+            if self._acquired_at is not None:
+                metrics.observe('chord.hold_seconds', metrics.now() - self._acquired_at)
+                self._acquired_at = None
+            self._resources = None
+        # Hand the released resources over to waiting chords right away, then wake them up
+        fairness.try_acquire_chords()
+        waiters.notify()
+
+    def get_wakeup_keys(self):
+        """
+        Keys of the pool events that may let this chord acquire: (pool, key) for each request, see Pool.get_request_key.
+        Returns None if they can't be determined, so the chord is retried whenever any resource is released.
+        """
+        keys = set()
+        for request in self._requests:
+            try:
+                pool = registry.get_pool(request.cls)
+            except UnknownResourceClassError:
+                return None
+            keys.add((pool, pool.get_request_key(request)))
+        return keys
 
     def set_error(self, error):
         self._error = error
 
     def _items(self, resource_map):
-        return itertools.chain(*[cls_resources.items() for cls_resources in itertools.chain(resource_map.values())])
+        return itertools.chain(*resource_map.values())
     
     def _try_acquire(self):
         if self._error:
             reraise(self._error[0], self._error[1], self._error[2])
         if self.is_satisfied():
             return True
+        if self._waiting_since is None and metrics.enabled():
+            self._waiting_since = metrics.now()
+        if not fairness.has_waiting_chords() and self.acquire():
+            # Nobody is waiting, so there's no one to be fair to
+            return True
         fairness.add_chord(self)
         fairness.try_acquire_chords()
         if self._error:
@@ -120,14 +301,59 @@ class Chord(object):
     def __repr__(self):
         return "<Chord {}>".format(self._requests.__repr__() if self._resources is None else self._resources.__repr__())
 
+    def _start_waiting(self):
+        """
+        Returns the deadline to wait until: the earliest of the chord's deadline, its timeout and the deadline of
+        the chord whose block it is entered in
+        """
+        with self._lock:
+            self._abandoned = False
+        deadlines = [deadline for deadline in (self._deadline, get_deadline()) if deadline is not None]
+        if self._timeout is not None:
+            deadlines.append(time.time() + self._timeout)
+        return min(deadlines) if deadlines else None
+
+    def _wait_timed_out(self):
+        """
+        Leave the fairness queue, and raise AcquireTimeoutError unless acquired meanwhile.
+        The chord is abandoned first, so fairness iterations still holding it can't acquire it afterwards.
+        """
+        with self._lock:
+            if self.is_satisfied():
+                return
+            self._abandoned = True
+        fairness.remove_chord(self)
+        self._waiting_since = None
+        if metrics.enabled():
+            metrics.increment('chord.timeouts', policy=type(fairness.get_fairness_policy()).__name__)
+        if tracing.enabled():
+            tracing.trace('timeout', 'Timed out waiting for {chord}', chord=self)
+        raise AcquireTimeoutError("Timed out waiting for resources of {}".format(self))
+
     def __enter__(self):
+        deadline = self._start_waiting()
         try:
-            waiting.wait(self._try_acquire)
-            return self
+            if not waiters.wait(self._try_acquire, waiters.get_remaining(deadline)):
+                self._wait_timed_out()
         except:
             self.__exit__(*sys.exc_info())
             raise
+        if self._deadline is not None:
+            outer_deadline = get_deadline()
+            self._deadline_token = _deadline.set(self._deadline if outer_deadline is None else min(self._deadline, outer_deadline))
+        return self
 
     def __exit__(self, exc_type, exc_value, traceback):
+        if self._deadline_token is not None:
+            token, self._deadline_token = self._deadline_token, None
+            _deadline.reset(token)
         fairness.remove_chord(self)
         self.release()
+
+    def __aenter__(self):
+        from .more.asyncio_task import enter_chord
+        return enter_chord(self)
+
+    def __aexit__(self, exc_type, exc_value, traceback):
+        from .more.asyncio_task import exit_chord
+        return exit_chord(self, exc_type, exc_value, traceback)
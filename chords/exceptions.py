@@ -9,3 +9,6 @@ class UnknownResourceClassError(ChordError):
 
 class UnsatisfiableRequestError(ChordError):
     pass
+
+class AcquireTimeoutError(ChordError):
+    pass
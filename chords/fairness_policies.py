@@ -1,67 +1,203 @@
-import flux, logging, sys
+import flux, sys, threading
 from collections import OrderedDict
-
-_logger = logging.getLogger('Chords')
+from . import metrics
+from . import tracing
+from . import waiters
 
 ITERATION_MINIMUM = 1
+_DEFAULT = object()
 
 
 class BestEffortFairness(object):
     """
     Simple queued policy, that lets older chords a chance to acquire resources first.
     We give all chords a fair chance, ordered by age.
+    The queue is guarded by a lock, and only one thread iterates over the chords at a time.
+
+    Waiting chords are indexed by the pools (and keys, for keyed pools) they request. When resources become
+    available, an iteration only retries new chords and chords waiting on those pools, unless the policy
+    needs to see every chord (see INCREMENTAL).
+
+    Iterations run as soon as chords are added or resources become available. In addition, unless iteration_minimum
+    is None, all chords are retried when polled after iteration_minimum seconds, to catch resources released
+    without their pool knowing. With iteration_minimum=None, scheduling is driven only by state changes.
     """
-    def __init__(self):
+    INCREMENTAL = True
+
+    def __init__(self, iteration_minimum=_DEFAULT):
+        """
+        iteration_minimum defaults to the module's ITERATION_MINIMUM
+        """
+        self._iteration_minimum = iteration_minimum
         self._queue = OrderedDict()
+        self._lock = threading.Lock()
+        self._loop_lock = threading.Lock()
         self._in_loop = False
         self._last_run = 0
+        self._dirty = False
+        self._removed = 0
+        self._counter = 0
+        self._waiting = {}
+        self._chord_keys = {}
+        self._new = set()
+        self._released = set()
+        self._full_scan = False
 
     def add(self, chord):
-        self._queue[chord] = chord
+        with self._lock:
+            if chord not in self._queue:
+                self._counter += 1
+                self._queue[chord] = self._queue_key(chord)
+                self._index(chord)
+                self._new.add(chord)
+                self._dirty = True
 
     def remove(self, chord):
-        self._queue.pop(chord, None)
+        with self._lock:
+            if self._queue.pop(chord, None) is not None:
+                self._unindex(chord)
+                self._new.discard(chord)
+                self._removed += 1
+
+    def _queue_key(self, chord):
+        """
+        Chords are retried in ascending order of their keys, fixed when they are added
+        """
+        return self._counter
+
+    def _ordered(self):
+        """
+        All waiting chords, in order
+        """
+        return list(self._queue)
+
+    def _index(self, chord):
+        keys = chord.get_wakeup_keys()
+        if keys is None:
+            keys = [None]
+        self._chord_keys[chord] = keys
+        for key in keys:
+            self._waiting.setdefault(key, OrderedDict())[chord] = None
+
+    def _unindex(self, chord):
+        for key in self._chord_keys.pop(chord):
+            waiting = self._waiting[key]
+            del waiting[chord]
+            if not waiting:
+                del self._waiting[key]
+
+    def has_waiting_chords(self):
+        return len(self._queue) > 0
+
+    def notify_release(self, pool=None, key=None):
+        """
+        Resources of pool with the given key became available (any pool, if None), so chords waiting on them
+        should be retried without waiting for iteration_minimum to pass
+        """
+        with self._lock:
+            if pool is None:
+                self._full_scan = True
+            else:
+                self._released.add((pool, key))
+            self._dirty = True
 
     def try_acquire_chords(self):
-        should_run = (flux.current_timeline.time() - self._last_run) >= ITERATION_MINIMUM
-        if not should_run:
-            return
-        if self._in_loop:
-            return
-        self._in_loop = True
-        self._last_run = flux.current_timeline.time()
-        self._check_chords()
-        self._in_loop = False
+        while self._should_run():
+            if not self._loop_lock.acquire(False):
+                # Another thread is iterating, and will iterate again if anything changed meanwhile
+                return
+            try:
+                self._run_loop()
+            finally:
+                self._loop_lock.release()
+
+    def _should_run(self):
+        if self._dirty:
+            return True
+        iteration_minimum = ITERATION_MINIMUM if self._iteration_minimum is _DEFAULT else self._iteration_minimum
+        if iteration_minimum is None:
+            return False
+        return (flux.current_timeline.time() - self._last_run) >= iteration_minimum
+
+    def _run_loop(self):
+        try:
+            if not self._dirty:
+                self._full_scan = True
+            while True:
+                self._in_loop = True
+                self._dirty = False
+                self._last_run = flux.current_timeline.time()
+                removed = self._removed
+                self._check_chords()
+                if self._removed != removed:
+                    # Some chords were acquired or failed, wake them up
+                    waiters.notify()
+                if not self._dirty:
+                    break
+        finally:
+            self._in_loop = False
+
+    def _chords(self):
+        """
+        Chords to retry in this iteration, ordered by age
+        """
+        with self._lock:
+            full_scan = self._full_scan or not self.INCREMENTAL
+            new, self._new = self._new, set()
+            released, self._released = self._released, set()
+            self._full_scan = False
+            if full_scan:
+                return self._ordered()
+
+            chords = set(new)
+            chords.update(self._waiting.get(None, ()))
+            for pool, key in released:
+                chords.update(self._waiting.get((pool, key), ()))
+                if key is not None:
+                    chords.update(self._waiting.get((pool, None), ()))
+            return sorted(chords, key=self._queue.__getitem__)
 
     def _check_chords(self):
-        _logger.debug('Trying to acquire {} chords'.format(len(self._queue)))
-        for chord in self: # Give everyone a chance to acquire
+        chords = self._chords()
+        if tracing.enabled():
+            tracing.trace('check_chords', 'Trying to acquire {chords} of {waiting} chords', chords=len(chords), waiting=len(self._queue), policy=self)
+        if metrics.enabled():
+            metrics.gauge('fairness.queue_depth', len(self._queue), policy=type(self).__name__)
+            metrics.increment('fairness.retries', len(chords), policy=type(self).__name__)
+        for chord in self._iter_chords(chords): # Give everyone a chance to acquire
             try:
                 self._handle_chord(chord)
             except Exception as e:
-                _logger.debug('Set exception on {}:{}'.format(chord, e))
+                if tracing.enabled():
+                    tracing.trace('chord_error', 'Set exception on {chord}:{error}', chord=chord, error=e)
                 chord.set_error(sys.exc_info())
                 self.remove(chord)
 
+    def _iter_chords(self, chords):
+        return iter(chords)
+
     def _handle_chord(self, chord):
-        chord.acquire()
+        chord._acquire_waiting()
 
     def __iter__(self):
-        return list(self._queue).__iter__()
+        with self._lock:
+            return self._ordered().__iter__()
     
 
 class StrictFIFOFairness(BestEffortFairness):
     """
     Always ensure older chords are acquired before newer ones.
     """
-    def __iter__(self):
-        for chord in list(self._queue):
+    INCREMENTAL = False
+
+    def _iter_chords(self, chords):
+        for chord in chords:
             if not self._in_loop:
                 break
             yield chord
                 
     def _handle_chord(self, chord):
-        self._in_loop = chord.acquire()
+        self._in_loop = chord._acquire_waiting()
 
 
 class ExclusiveResourceBlocksFairness(BestEffortFairness):
@@ -69,6 +205,7 @@ class ExclusiveResourceBlocksFairness(BestEffortFairness):
     When a resource is requested exclusivly, don't allow any new shared locks on it.
     This fairness policy prevents starvation.
     """
+    INCREMENTAL = False
 
     def _check_chords(self):
         self._blocking = set()
@@ -76,17 +213,128 @@ class ExclusiveResourceBlocksFairness(BestEffortFairness):
 
     def _handle_chord(self, chord):
         if all(request not in self._blocking for request in chord._requests):
-            chord.acquire()
+            chord._acquire_waiting()
         for request in chord._requests:
             if request.is_exclusive():
                 self._blocking.add(request)
 
+
+class PriorityFairness(BestEffortFairness):
+    """
+    Retry chords with higher priority first (see Chord.get_priority), and older chords first among equal priorities.
+    Waiting chords age: every second waited raises their priority by aging_rate, so low priority chords aren't starved.
+
+    The aged priority is priority + aging_rate * waited, and all chords have waited until the same time now, so
+    chords are ordered by the fixed key aging_rate * added_time - priority. Adding and removing chords stay O(1),
+    and each iteration sorts the chords it retries by their keys, as BestEffortFairness sorts them by age.
+    """
+    def __init__(self, aging_rate=1.0, iteration_minimum=_DEFAULT):
+        super(PriorityFairness, self).__init__(iteration_minimum)
+        self._aging_rate = aging_rate
+
+    def _queue_key(self, chord):
+        return (self._aging_rate * flux.current_timeline.time() - chord.get_priority(), self._counter)
+
+    def _ordered(self):
+        return sorted(self._queue, key=self._queue.__getitem__)
+
+
+class ShardedFairness(object):
+    """
+    Waiting chords queued in shards by the resource classes they request, each shard with its own policy.
+    Releases only iterate over the shards of chords requesting the released pool, so e.g. a release of a Host
+    never retries chords that only request Licenses, even with non incremental policies.
+    Chords are ordered only against the chords of their own shard.
+    """
+    def __init__(self, policy_factory=BestEffortFairness):
+        """
+        policy_factory() creates the policy of each shard, unless set for its class by set_class_policy
+        """
+        self._policy_factory = policy_factory
+        self._class_factories = {}
+        self._shards = {}
+        self._pool_shards = {}
+        self._any_pool_shards = set()
+        self._chord_shards = {}
+        self._lock = threading.Lock()
+
+    def set_class_policy(self, cls, policy_factory):
+        """
+        Use policy_factory for the shard of chords requesting only cls, once it is next created
+        """
+        with self._lock:
+            self._class_factories[cls] = policy_factory
+
+    def get_shards(self):
+        """
+        The policy of each shard, by the frozenset of classes its chords request
+        """
+        with self._lock:
+            return dict(self._shards)
+
+    def _get_shard(self, chord, keys):
+        classes = frozenset(request.cls for request in chord._requests)
+        shard = self._shards.get(classes)
+        if shard is None:
+            factory = self._policy_factory
+            if len(classes) == 1:
+                factory = self._class_factories.get(next(iter(classes)), factory)
+            shard = self._shards[classes] = factory()
+        if keys is None:
+            self._any_pool_shards.add(shard)
+        else:
+            for pool, _ in keys:
+                self._pool_shards.setdefault(pool, set()).add(shard)
+        return shard
+
+    def add(self, chord):
+        keys = chord.get_wakeup_keys()
+        with self._lock:
+            if chord in self._chord_shards:
+                return
+            shard = self._chord_shards[chord] = self._get_shard(chord, keys)
+        shard.add(chord)
+
+    def remove(self, chord):
+        with self._lock:
+            shard = self._chord_shards.pop(chord, None)
+        if shard is not None:
+            shard.remove(chord)
+
+    def has_waiting_chords(self):
+        return len(self._chord_shards) > 0
+
+    def notify_release(self, pool=None, key=None):
+        with self._lock:
+            if pool is None:
+                shards = list(self._shards.values())
+            else:
+                shards = list(self._pool_shards.get(pool, ()))
+                shards.extend(self._any_pool_shards)
+        for shard in shards:
+            shard.notify_release(pool, key)
+
+    def try_acquire_chords(self):
+        with self._lock:
+            shards = list(self._shards.values())
+        for shard in shards:
+            shard.try_acquire_chords()
+
+    def __iter__(self):
+        with self._lock:
+            shards = list(self._shards.values())
+        return iter([chord for shard in shards for chord in shard])
+
+
 _fairness = BestEffortFairness()
 
 def set_fairness_policy(policy):
     global _fairness
     _fairness = policy
 
+def get_fairness_policy():
+    return _fairness
+
 def try_acquire_chords():
     _fairness.try_acquire_chords()
 
@@ -96,3 +344,9 @@ def add_chord(chord):
 def remove_chord(chord):
     _fairness.remove(chord)
 
+def has_waiting_chords():
+    return _fairness.has_waiting_chords()
+
+def notify_release(pool=None, key=None):
+    _fairness.notify_release(pool, key)
+
@@ -0,0 +1,174 @@
+"""
+Scheduler metrics: how long chords wait and hold their resources, how long resources stay busy,
+fairness queue depth, and acquire attempts and failures.
+Nothing is measured unless a sink is set, so callers check enabled() first.
+
+A sink gets every measurement, tagged with a dict:
+    observe(name, value, tags)    a duration, in seconds
+    increment(name, value, tags)  a counter
+    gauge(name, value, tags)      a current level
+MemorySink keeps them in memory, see enable.
+"""
+import threading
+import flux
+
+_sink = None
+
+def set_sink(sink):
+    """
+    Send measurements to sink, or stop measuring if None
+    """
+    global _sink
+    _sink = sink
+
+def get_sink():
+    return _sink
+
+def enable():
+    """
+    Measure into a new MemorySink, and return it
+    """
+    sink = MemorySink()
+    set_sink(sink)
+    return sink
+
+def enabled():
+    return _sink is not None
+
+def now():
+    return flux.current_timeline.time()
+
+def observe(name, value, **tags):
+    sink = _sink
+    if sink is not None:
+        sink.observe(name, value, tags)
+
+def increment(name, value=1, **tags):
+    sink = _sink
+    if sink is not None:
+        sink.increment(name, value, tags)
+
+def gauge(name, value, **tags):
+    sink = _sink
+    if sink is not None:
+        sink.gauge(name, value, tags)
+
+
+class Histogram(object):
+    """
+    Durations in exponential buckets, from a microsecond up, each twice as large as the previous one
+    """
+    SMALLEST = 1e-6
+    BUCKETS = 40
+
+    def __init__(self):
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+        self._buckets = [0] * self.BUCKETS
+
+    def add(self, value):
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        bound, index = self.SMALLEST, 0
+        while value > bound and index < self.BUCKETS - 1:
+            bound *= 2
+            index += 1
+        self._buckets[index] += 1
+
+    def percentile(self, fraction):
+        """
+        Upper bound of the bucket holding the given fraction of the values
+        """
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        bound = self.SMALLEST
+        for count in self._buckets:
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+            bound *= 2
+        return self.max
+
+    def summary(self):
+        return dict(count=self.count, sum=self.sum, min=self.min, max=self.max,
+                    p50=self.percentile(0.5), p99=self.percentile(0.99))
+
+
+def _key(name, tags):
+    items = []
+    for tag, value in sorted(tags.items()):
+        try:
+            hash(value)
+        except TypeError:
+            value = id(value)
+        items.append((tag, value))
+    return (name, tuple(items))
+
+
+class MemorySink(object):
+    """
+    Keeps a histogram per observed name and tags, and the latest value of counters and gauges
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._started = now()
+        self._histograms = {}
+        self._counters = {}
+        self._gauges = {}
+
+    def observe(self, name, value, tags):
+        key = _key(name, tags)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.add(value)
+
+    def increment(self, name, value, tags):
+        key = _key(name, tags)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def gauge(self, name, value, tags):
+        with self._lock:
+            self._gauges[_key(name, tags)] = value
+
+    def get_histogram(self, name, **tags):
+        with self._lock:
+            return self._histograms.get(_key(name, tags))
+
+    def get_counter(self, name, **tags):
+        with self._lock:
+            return self._counters.get(_key(name, tags), 0)
+
+    def get_gauge(self, name, **tags):
+        with self._lock:
+            return self._gauges.get(_key(name, tags))
+
+    def get_utilisation(self, resource):
+        """
+        Fraction of the time since the sink was created that resource was acquired.
+        Resources are tagged by their repr, so measurements don't keep them alive.
+        """
+        histogram = self.get_histogram('resource.busy_seconds', resource=repr(resource))
+        elapsed = now() - self._started
+        if histogram is None or elapsed <= 0:
+            return 0.0
+        return histogram.sum / elapsed
+
+    def snapshot(self):
+        """
+        All measurements, as lists of dicts with name, tags and either a histogram summary or a value
+        """
+        with self._lock:
+            return dict(
+                histograms=[dict(name=name, tags=dict(tags), **histogram.summary()) for (name, tags), histogram in self._histograms.items()],
+                counters=[dict(name=name, tags=dict(tags), value=value) for (name, tags), value in self._counters.items()],
+                gauges=[dict(name=name, tags=dict(tags), value=value) for (name, tags), value in self._gauges.items()],
+            )
@@ -0,0 +1,94 @@
+import asyncio, sys, threading, time
+from .. import waiters
+from ..task import Task
+
+
+class FutureNotifier(object):
+    """
+    Resolves the futures of chords waiting in event loops whenever waiting chords are notified
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._futures = set()
+
+    def create_future(self):
+        future = asyncio.get_running_loop().create_future()
+        with self._lock:
+            self._futures.add(future)
+        return future
+
+    def discard(self, future):
+        with self._lock:
+            self._futures.discard(future)
+
+    def notify(self):
+        with self._lock:
+            futures, self._futures = self._futures, set()
+        for future in futures:
+            try:
+                future.get_loop().call_soon_threadsafe(_resolve, future)
+            except RuntimeError:
+                pass # Loop is closed
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+
+_notifier = FutureNotifier()
+waiters.add_listener(_notifier.notify)
+
+
+async def wait(predicate, timeout_seconds=None):
+    """
+    Await until predicate is true, retrying only when notified. Returns False if it isn't after timeout_seconds.
+    """
+    deadline = None if timeout_seconds is None else time.time() + timeout_seconds
+    while True:
+        # Register before checking, so a notification arriving meanwhile isn't missed
+        future = _notifier.create_future()
+        try:
+            if predicate():
+                return True
+            remaining = waiters.get_remaining(deadline)
+            if remaining is None:
+                await future
+            elif remaining <= 0:
+                return False
+            else:
+                try:
+                    await asyncio.wait_for(future, remaining)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            _notifier.discard(future)
+
+
+async def enter_chord(chord):
+    """
+    Unlike with, async with doesn't set the chord's deadline for chords entered within its block
+    """
+    try:
+        if not await wait(chord._try_acquire, waiters.get_remaining(chord._start_waiting())):
+            chord._wait_timed_out()
+        return chord
+    except BaseException:
+        chord.__exit__(*sys.exc_info())
+        raise
+
+
+async def exit_chord(chord, exc_type, exc_value, traceback):
+    return chord.__exit__(exc_type, exc_value, traceback)
+
+
+class AsyncTask(Task):
+    """
+    Task that runs a coroutine, awaiting its resources without blocking the event loop
+    """
+    async def start(self, *args, **kwargs):
+        resources = self._get_resources(args, kwargs)
+        async with resources:
+            if self._run is None:
+                return await self.run(resources, *args, **kwargs)
+            return await self._run(*self._get_run_args(resources, args), **kwargs)
@@ -0,0 +1,26 @@
+import time
+from gevent.event import Event
+from ..waiters import get_remaining
+
+
+class GeventWaiter(object):
+    """
+    Sleep on a gevent event until notified that resources were released, instead of polling
+    """
+    def __init__(self):
+        self._event = Event()
+
+    def wait(self, predicate, timeout_seconds=None):
+        deadline = None if timeout_seconds is None else time.time() + timeout_seconds
+        while True:
+            event = self._event
+            if predicate():
+                return True
+            remaining = get_remaining(deadline)
+            if remaining is not None and remaining <= 0:
+                return False
+            event.wait(remaining)
+
+    def notify(self):
+        event, self._event = self._event, Event()
+        event.set()
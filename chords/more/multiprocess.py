@@ -0,0 +1,148 @@
+"""
+Resources shared by the processes of a single machine, e.g. a multiprocessing pool of workers.
+Their acquisition state lives in shared memory, guarded by a lock shared by all processes.
+
+Create a SharedState before starting the processes, and pass it to them (or fork after creating it).
+Every process then creates a SharedPool on it, and adds the same resources in the same order,
+so each resource gets the same slot of the state. Chords waiting on resources held by other processes
+are woken up by SharedWaiter, which should be set in every process.
+"""
+import multiprocessing, threading, time
+from ..pool import Pool
+from ..resource import Resource
+from ..waiters import get_remaining
+from .. import fairness_policies as fairness
+
+_EXCLUSIVE = 0
+_USED = 1
+_FIELDS = 2
+
+
+class SharedState(object):
+    """
+    Shared memory for the state of up to size resources: whether each is acquired exclusively and the units
+    used by shared requests, and a generation counter incremented whenever any of them is released
+    """
+    def __init__(self, size, context=multiprocessing):
+        self.lock = context.RLock()
+        self._size = size
+        self._values = context.RawArray('l', size * _FIELDS + 1)
+
+    def get_size(self):
+        return self._size
+
+    def get(self, slot, field):
+        return self._values[slot * _FIELDS + field]
+
+    def set(self, slot, field, value):
+        self._values[slot * _FIELDS + field] = value
+
+    def get_generation(self):
+        return self._values[self._size * _FIELDS]
+
+    def released(self):
+        with self.lock:
+            self._values[self._size * _FIELDS] += 1
+
+
+class SharedResource(Resource):
+    """
+    Resource whose acquisition state is kept in a SharedState slot, assigned when added to a SharedPool.
+    Acquire and release it through chords, which hold the shared lock while doing so.
+    """
+    _state = None
+    _slot = None
+
+    def attach(self, state, slot):
+        self._state = state
+        self._slot = slot
+
+    @property
+    def _exclusive(self):
+        if self._state is None:
+            return False
+        return bool(self._state.get(self._slot, _EXCLUSIVE))
+
+    @_exclusive.setter
+    def _exclusive(self, exclusive):
+        if self._state is not None:
+            self._state.set(self._slot, _EXCLUSIVE, int(exclusive))
+
+    @property
+    def _used(self):
+        if self._state is None:
+            return 0
+        return self._state.get(self._slot, _USED)
+
+    @_used.setter
+    def _used(self, used):
+        if self._state is not None:
+            self._state.set(self._slot, _USED, used)
+
+    def acquire(self, request):
+        if self._state is None:
+            raise ValueError('{} must be added to a SharedPool before it is acquired'.format(self))
+        super(SharedResource, self).acquire(request)
+
+    def release(self, request):
+        super(SharedResource, self).release(request)
+        self._state.released()
+
+
+class SharedPool(Pool):
+    """
+    Pool of SharedResources, locked by the state's lock, so only one process finds and acquires resources at a time.
+    Other processes change the state of its resources without notifying it, so every find checks all of them.
+    """
+    def __init__(self, state):
+        super(SharedPool, self).__init__()
+        self.lock = state.lock
+        self._state = state
+        self._slots = 0
+
+    def add(self, resource):
+        if not isinstance(resource, SharedResource):
+            raise TypeError('Expected SharedResource, got {}'.format(resource))
+        with self.lock:
+            if self._slots >= self._state.get_size():
+                raise ValueError('{} has no free slots'.format(self._state))
+            resource.attach(self._state, self._slots)
+            self._slots += 1
+            super(SharedPool, self).add(resource)
+
+    def _candidates(self, request):
+        return self._all.find(request.kwargs)
+
+
+class SharedWaiter(object):
+    """
+    Sleep until resources are released by this process, or poll every sleep_seconds for releases by others.
+    Releases by other processes aren't known to this process's pools, so they retry all waiting chords.
+    """
+    def __init__(self, state, sleep_seconds=0.001):
+        self._state = state
+        self._sleep_seconds = sleep_seconds
+        self._condition = threading.Condition()
+        self._generation = 0
+
+    def wait(self, predicate, timeout_seconds=None):
+        deadline = None if timeout_seconds is None else time.time() + timeout_seconds
+        while True:
+            with self._condition:
+                generation = self._generation
+            shared_generation = self._state.get_generation()
+            if predicate():
+                return True
+            with self._condition:
+                while generation == self._generation and shared_generation == self._state.get_generation():
+                    remaining = get_remaining(deadline)
+                    if remaining is not None and remaining <= 0:
+                        return False
+                    self._condition.wait(self._sleep_seconds if remaining is None else min(remaining, self._sleep_seconds))
+            if shared_generation != self._state.get_generation():
+                fairness.notify_release()
+
+    def notify(self):
+        with self._condition:
+            self._generation += 1
+            self._condition.notify_all()
@@ -0,0 +1,72 @@
+"""
+Vectorized scoring for WeightedRandomPool, for pools too large to call a score method per resource.
+"""
+import random
+from operator import attrgetter
+import numpy
+from ..pool import _WeightedSampler
+
+
+class BatchScore(object):
+    """
+    Score all candidate resources at once: method gets one NumPy array per attribute, holding that attribute
+    of every candidate, and returns a vector of their weights. Negative and NaN weights count as 0.
+    Can still be called with a single resource, like a regular score method.
+    """
+    is_batch = True
+
+    def __init__(self, method, attributes):
+        self._method = method
+        self._getters = [attrgetter(attribute) for attribute in attributes]
+
+    def score(self, resources):
+        columns = [self._column(getter, resources) for getter in self._getters]
+        weights = numpy.array(self._method(*columns), dtype=float).reshape(-1)
+        if len(weights) != len(resources):
+            raise ValueError('Expected {} weights, got {}'.format(len(resources), len(weights)))
+        weights[~(weights > 0)] = 0
+        return weights
+
+    def _column(self, getter, resources):
+        try:
+            return numpy.fromiter(map(getter, resources), dtype=float, count=len(resources))
+        except (TypeError, ValueError): # Not numeric
+            return numpy.array([getter(resource) for resource in resources])
+
+    def draw(self, resources):
+        """
+        Yield the indices of resources in weighted random order.
+        The first draw, usually the only one needed, uses cumsum and searchsorted; later draws use the pool's sampler.
+        """
+        weights = self.score(resources)
+        if not len(weights):
+            return
+        cumulative = numpy.cumsum(weights)
+        first = None
+        if cumulative[-1] > 0:
+            first = int(numpy.searchsorted(cumulative, random.random() * cumulative[-1], side='right'))
+            if first < len(weights) and weights[first] > 0:
+                yield first
+            else:
+                first = None
+        sampler = _WeightedSampler(weights.tolist())
+        if first is not None:
+            sampler.take(first)
+        for _ in range(len(weights) - (first is not None)):
+            yield sampler.pop()
+
+    def __call__(self, resource):
+        return self.score([resource])[0]
+
+
+def batch_score(*attributes):
+    """
+    Decorator for batch score methods of WeightedRandomPool requests, see BatchScore:
+        > @batch_score('load')
+        > def by_load(load):
+        >     return 1.0 / (1 + load)
+        > Request(Host, score_method=by_load)
+    """
+    def wrapper(method):
+        return BatchScore(method, attributes)
+    return wrapper
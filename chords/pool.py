@@ -1,30 +1,242 @@
-import random, bisect
+import random, bisect, threading
+from collections import OrderedDict
+try:
+    from itertools import accumulate
+except ImportError: # Python 2
+    def accumulate(values):
+        total = 0
+        for value in values:
+            total += value
+            yield total
 from .resource import Resource
 from .exceptions import UnsatisfiableRequestError
+from . import fairness_policies as fairness
+
+FREE = 'free'
+SHARED = 'shared'
+_MAX_MATCHABLE_CACHE = 1024
+_lock_creation = threading.Lock()
+
+
+class _Index(object):
+    """
+    Resources keyed by identity, with secondary indexes on attribute values
+    """
+    def __init__(self, attributes):
+        self._resources = OrderedDict()
+        self._values = dict((attribute, {}) for attribute in attributes)
+
+    def add(self, resource):
+        self._resources[id(resource)] = resource
+        for attribute, values in self._values.items():
+            values.setdefault(getattr(resource, attribute, None), OrderedDict())[id(resource)] = resource
+
+    def remove(self, resource):
+        del self._resources[id(resource)]
+        for attribute, values in self._values.items():
+            value = getattr(resource, attribute, None)
+            bucket = values[value]
+            del bucket[id(resource)]
+            if not bucket:
+                del values[value]
+
+    def find(self, kwargs):
+        buckets = []
+        for attribute, values in self._values.items():
+            if attribute not in kwargs:
+                continue
+            try:
+                bucket = values.get(kwargs[attribute])
+            except TypeError: # Unhashable values can't be indexed
+                continue
+            if not bucket:
+                return []
+            buckets.append(bucket)
+        if not buckets:
+            return list(self._resources.values())
+        buckets.sort(key=len)
+        smallest, others = buckets[0], buckets[1:]
+        return [resource for key, resource in smallest.items() if all(key in bucket for bucket in others)]
+
+    def __len__(self):
+        return len(self._resources)
+
 
 class Pool(object):
+    """
+    A collection of resources of a single registered class.
+    The pool's lock guards both its resources and their acquisition state: chords hold it while
+    finding, acquiring and releasing resources (see registry.locked_pools).
+
+    Resources notify their pool when acquired or released, and the pool keeps the free and shared
+    resources apart (full ones are neither), so requests only scan resources they might acquire,
+    and an exhausted pool is skipped at once.
+    """
+    _attributes = ()
+    _indexed_resources = None
+    _lock = None
+
     def __init__(self):
         super(Pool, self).__init__()
         self._resources = []
+        self.lock = threading.RLock()
+
+    @property
+    def lock(self):
+        """
+        Created on first use, so subclasses that don't call Pool.__init__ still have one
+        """
+        if self._lock is None:
+            with _lock_creation:
+                if self._lock is None:
+                    self._lock = threading.RLock()
+        return self._lock
+
+    @lock.setter
+    def lock(self, lock):
+        self._lock = lock
 
     def add(self, resource):
         assert isinstance(resource, Resource)
-        self._resources.append(resource)
+        with self.lock:
+            self._sync()
+            self._resources.append(resource)
+            self._track(resource)
 
     def remove(self, resource):
-        self._resources.remove(resource)
+        with self.lock:
+            self._sync()
+            resource = self._resources.pop(self._resources.index(resource))
+            self._untrack(resource)
+
+    def _sync(self):
+        """
+        Subclasses may assign _resources directly, so index them whenever it's replaced
+        """
+        if self._indexed_resources is self._resources:
+            return
+        self._indexed_resources = self._resources
+        self._all = _Index(self._attributes)
+        self._available = {FREE: _Index(self._attributes), SHARED: _Index(self._attributes)}
+        self._states = {}
+        self._matchable = {}
+        for resource in self:
+            self._track(resource)
+
+    def _track(self, resource):
+        self._all.add(resource)
+        self._states[id(resource)] = None
+        self._matchable.clear()
+        resource.set_pool(self)
+        self.resource_changed(resource)
+
+    def _untrack(self, resource):
+        self._all.remove(resource)
+        state = self._states.pop(id(resource))
+        if state is not None:
+            self._available[state].remove(resource)
+        self._matchable.clear()
+        resource.set_pool(None)
+
+    def resource_changed(self, resource, released=False):
+        """
+        Called by resources of this pool when acquired or released
+        """
+        # Whether resources match may depend on their state, so recheck blocked requests after it changes
+        self._matchable.clear()
+        if resource.is_full():
+            state = None
+        elif resource.is_shared():
+            state = SHARED
+        else:
+            state = FREE
+        old_state = self._states[id(resource)]
+        if state == old_state:
+            if released and state is not None and resource.get_capacity() is not None:
+                # Freed units may be enough for requests that need more than were left
+                fairness.notify_release(self, self.get_resource_key(resource))
+            return
+        if old_state is not None:
+            self._available[old_state].remove(resource)
+        if state is not None:
+            self._available[state].add(resource)
+        self._states[id(resource)] = state
+        if old_state is None or state == FREE:
+            fairness.notify_release(self, self.get_resource_key(resource))
+
+    def capacity_changed(self, resource):
+        """
+        Called by resources of this pool when their capacity is set
+        """
+        with self.lock:
+            self._matchable.clear()
+            self.resource_changed(resource, True)
+
+    def get_request_key(self, request):
+        """
+        Key of the only resources that can satisfy request, or None if any resource in the pool might
+        """
+        return None
+
+    def get_resource_key(self, resource):
+        """
+        Key of resource, as returned by get_request_key for requests it can satisfy
+        """
+        return None
 
     def find(self, request):
+        self._sync()
         found = False
-        for resource in self.all():
-            if resource.matches(request):
+        for resource in self._candidates(request):
+            if resource.matches(request) and resource.can_fit(request):
                 found = True
                 if resource.can_acquire(request):
                     yield resource
 
-        if not found:
+        if not found and not self._can_match(request):
             raise UnsatisfiableRequestError("No resources can match request {}".format(request))
 
+    def find_many(self, request, count, taken=None):
+        """
+        Return up to count different resources for request, in a single pass over the pool.
+        Resources whose ids are in taken are skipped, and the ids of returned resources are added to it.
+        """
+        if taken is None:
+            taken = set()
+        res = []
+        if count <= 0:
+            return res
+        for resource in self.find(request):
+            if id(resource) not in taken:
+                taken.add(id(resource))
+                res.append(resource)
+                if len(res) == count:
+                    break
+        return res
+
+    def _candidates(self, request):
+        """
+        Resources that may be acquired by request: free ones, and shared ones for shared requests
+        """
+        res = self._available[FREE].find(request.kwargs)
+        if request.is_shared():
+            res.extend(self._available[SHARED].find(request.kwargs))
+        return res
+
+    def _can_match(self, request):
+        """
+        Whether any resource matches request and has the capacity for it, even if it's currently acquired.
+        Cached until resources are added, removed, acquired or released, so requests retried between those
+        don't rescan held resources.
+        """
+        if request in self._matchable:
+            return self._matchable[request]
+        if len(self._matchable) >= _MAX_MATCHABLE_CACHE:
+            self._matchable.clear()
+        res = self._matchable[request] = any(resource.matches(request) and resource.can_fit(request)
+                                             for resource in self._all.find(request.kwargs))
+        return res
+
     def get(self, request):
         """
         Return the first resource matching the request
@@ -45,19 +257,38 @@ class HashPool(Pool):
         Key is a callback to get a key for a given resource
         """
         self._resources = {}
+        self.lock = threading.RLock()
         if key is None:
             key = lambda x: x
         self._key = key
 
     def add(self, resource):
-        self._resources[self._key(resource)] = resource
+        with self.lock:
+            self._sync()
+            key = self._key(resource)
+            if key in self._resources:
+                self._untrack(self._resources[key])
+            self._resources[key] = resource
+            self._track(resource)
 
     def remove(self, resource):
-        del self._resources[self._key(resource)]
+        with self.lock:
+            self._sync()
+            self._untrack(self._resources.pop(self._key(resource)))
+
+    def get_request_key(self, request):
+        if 'key' in request.kwargs and request.kwargs.get('key') in self._resources:
+            return request.kwargs.get('key')
+        return None
+
+    def get_resource_key(self, resource):
+        return self._key(resource)
 
     def find(self, request):
         if 'key' in request.kwargs and request.kwargs.get('key') in self._resources:
             resource = self._resources[request.kwargs.get('key')]
+            if not resource.can_fit(request):
+                raise UnsatisfiableRequestError("{} doesn't have the capacity for request {}".format(resource, request))
             if resource.can_acquire(request):
                 yield resource
         else:
@@ -65,7 +296,7 @@ class HashPool(Pool):
                 yield resource
 
     def __iter__(self):
-        return self._resources.itervalues()
+        return iter(self._resources.values())
 
 
 class RandomPool(Pool):
@@ -74,50 +305,156 @@ class RandomPool(Pool):
         random.shuffle(res)
         return res
 
+    def _candidates(self, request):
+        res = super(RandomPool, self)._candidates(request)
+        random.shuffle(res)
+        return res
+
 
 class WeightedRandomPool(Pool):
     """
     Define request.score_method to create a weighted random score. 
     Uniform random is default.
     Score has to be >=0
+    Only resources that might be acquired are scored, and each draw takes O(log n).
     """
     def find(self, request):
+        self._sync()
         found = False
-        resources = self.all()
+        resources = self._candidates(request)
+        score_method = request.score_method
 
-        scores = self._calc_scores(resources, request)
+        if score_method is None:
+            draws = self._draw_uniform(resources)
+        else:
+            draws = self._draw_weighted(resources, score_method)
 
-        while resources:
-            resource = self._pop_resource(resources, scores)
-            if resource.matches(request):
+        for resource in draws:
+            if resource.matches(request) and resource.can_fit(request):
                 found = True
                 if resource.can_acquire(request):
                     yield resource
 
-        if not found:
+        if not found and not self._can_match(request):
             raise UnsatisfiableRequestError("No resources can match request {}".format(request))
 
-    def _calc_scores(self, resources, request):
-        score_method = request.kwargs.pop('score_method', lambda _:1)
-        scores = []
-        for resource in resources:
-            scores.append(max(score_method(resource), 0))
-        return scores
-    
-    def _pop_resource(self, resources, scores):
-        cum_scores = self._cumsum(scores)
-        score_sum = cum_scores[-1]
-        score = random.random() * score_sum
-        i = bisect.bisect_left(cum_scores, score)
-        resource = resources[i]
-        del scores[i]
-        del resources[i]
-        return resource
-
-    def _cumsum(self, scores):
-        res = []
-        s = 0
-        for score in scores:
-            res.append(score + s)
-            s = res[-1]
-        return res
+
+    def _draw_uniform(self, resources):
+        """
+        Lazy shuffle: draw a random remaining resource, and swap it with the last one
+        """
+        remaining = len(resources)
+        while remaining:
+            i = random.randrange(remaining)
+            remaining -= 1
+            resources[i], resources[remaining] = resources[remaining], resources[i]
+            yield resources[remaining]
+
+    def _draw_weighted(self, resources, score_method):
+        if getattr(score_method, 'is_batch', False):
+            # Vectorized scoring of all candidates, see chords.more.numpy_scoring
+            indices = score_method.draw(resources)
+        else:
+            sampler = _WeightedSampler([score if score > 0 else 0 for score in map(score_method, resources)])
+            indices = (sampler.pop() for _ in range(len(resources)))
+        for index in indices:
+            yield resources[index]
+
+
+class _WeightedSampler(object):
+    """
+    Weighted random sampling without replacement, using a Fenwick (binary indexed) tree of the weights.
+    Each draw takes O(log n). Once only zero weights remain, they're drawn in order.
+    Most finds stop after the first draw, which only needs prefix sums, so the tree is built on the second draw.
+    """
+    def __init__(self, weights):
+        self._weights = list(weights)
+        self._size = len(self._weights)
+        self._drawn = [False] * self._size
+        self._next_unweighted = 0
+        self._top = 1
+        while self._top * 2 <= self._size:
+            self._top *= 2
+        self._first = True
+        self._tree = None
+
+    def _build(self):
+        # Node i holds the sum of the (i & -i) weights ending at i
+        prefix = [0]
+        prefix.extend(accumulate(self._weights))
+        self._tree = [prefix[i] - prefix[i - (i & -i)] for i in range(self._size + 1)]
+
+    def _total(self):
+        total = 0
+        i = self._size
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def take(self, index):
+        """
+        Remove the weight at index from later draws
+        """
+        self._drawn[index] = True
+        weight = self._weights[index]
+        self._weights[index] = 0
+        if self._tree is None:
+            return index
+        i = index + 1
+        while i <= self._size:
+            self._tree[i] -= weight
+            i += i & -i
+        return index
+
+    def _search(self, value):
+        """
+        Index of the first weight whose cumulative sum exceeds value
+        """
+        i = 0
+        step = self._top
+        while step:
+            if i + step <= self._size and self._tree[i + step] <= value:
+                i += step
+                value -= self._tree[i]
+            step //= 2
+        return i
+
+    def pop(self):
+        if self._first:
+            self._first = False
+            prefix = list(accumulate(self._weights))
+            if prefix and prefix[-1] > 0:
+                index = bisect.bisect_right(prefix, random.random() * prefix[-1])
+                if index < self._size and self._weights[index] > 0:
+                    return self.take(index)
+        if self._tree is None:
+            self._build()
+        while True:
+            total = self._total()
+            if total <= 0:
+                return self._pop_unweighted()
+            index = self._search(random.random() * total)
+            if index < self._size and self._weights[index] > 0:
+                return self.take(index)
+            # Removing weights accumulated rounding errors, rebuild from the remaining weights
+            self._build()
+            if self._total() <= 0:
+                return self._pop_unweighted()
+
+    def _pop_unweighted(self):
+        while self._drawn[self._next_unweighted]:
+            self._next_unweighted += 1
+        self._drawn[self._next_unweighted] = True
+        return self._next_unweighted
+
+
+class IndexedPool(Pool):
+    """
+    Pool with secondary indexes on the given resource attributes, for large pools.
+    A request with kwargs named after indexed attributes only considers resources whose attribute equals the
+    requested value (and that still match the request). Indexed attributes must not change while in the pool.
+    """
+    def __init__(self, attributes=()):
+        self._attributes = tuple(attributes)
+        super(IndexedPool, self).__init__()
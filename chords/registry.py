@@ -1,26 +1,30 @@
-import logging
+import logging, threading
+from contextlib import contextmanager
 from .pool import Pool
 from .exceptions import UnknownResourceClassError
 
 _registry = {}
+_lock = threading.Lock()
 _logger = logging.getLogger('Chords')
 
 def register(cls, pool=None):
-    if cls in _registry:
-        raise ValueError('{} is already registered'.format(cls))
     if pool is None:
         pool = Pool()
     if not isinstance(pool, Pool):
         raise TypeError('Expected Pool, got {}'.format(pool))
-    _logger.debug('Registering {}'.format(cls))
-    _registry[cls] = pool
+    with _lock:
+        if cls in _registry:
+            raise ValueError('{} is already registered'.format(cls))
+        _logger.debug('Registering {}'.format(cls))
+        _registry[cls] = pool
     return pool
 
 def unregister(cls):
-    if not cls in _registry:
-        raise UnknownResourceClassError("{} is not registered".format(cls))
-    _logger.debug('Ungistering {}'.format(cls))
-    del _registry[cls]
+    with _lock:
+        if not cls in _registry:
+            raise UnknownResourceClassError("{} is not registered".format(cls))
+        _logger.debug('Ungistering {}'.format(cls))
+        del _registry[cls]
 
 def get_pool(cls):
     if not cls in _registry:
@@ -37,3 +41,17 @@ def find_resources(request):
         raise UnknownResourceClassError("{} is not registered".format(request.cls))
     return _registry[request.cls].find(request)
 
+@contextmanager
+def locked_pools(classes):
+    """
+    Lock the pools of all given resource classes.
+    Pools are always locked in the same order, so chords locking overlapping classes can't deadlock.
+    """
+    pools = sorted(set(get_pool(cls) for cls in classes), key=id)
+    for pool in pools:
+        pool.lock.acquire()
+    try:
+        yield
+    finally:
+        for pool in reversed(pools):
+            pool.lock.release()
@@ -1,10 +1,61 @@
-from collections import OrderedDict
+class FrozenKwargs(dict):
+    """
+    Request arguments, which can't change once the request is created
+    """
+    def _immutable(self, *args, **kwargs):
+        raise TypeError("Request arguments can't be modified")
+
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = _immutable
+
+
+def _hashable(value):
+    """
+    Hashable stand-in for value, equal for equal values, so requests with unhashable arguments can still be hashed by value
+    """
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        pass
+    if isinstance(value, dict):
+        return frozenset((_hashable(key), _hashable(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(_hashable(item) for item in value)
+    if isinstance(value, set):
+        return frozenset(value)
+    # Can't tell which values are equal, so only the argument name counts
+    return None
+
 
 class Request(object):
+    """
+    A request for a resource of class cls, matching the given arguments.
+    Arguments are also available as attributes, returning None if missing.
+    A score_method argument isn't matched, it's used to weigh resources, see WeightedRandomPool.
+    A units argument isn't matched either, it's the part of a resource's capacity a shared request uses (1 by default).
+    """
+    __slots__ = ('cls', 'count', 'score_method', 'units', '_exclusive', '_items', '_kwargs', '_hash')
+
     def __init__(self, cls, exclusive=False, **kwargs):
         self.cls = cls
-        self.kwargs = OrderedDict(sorted(kwargs.items(), key=lambda x:x[0]))
+        self.score_method = kwargs.pop('score_method', None)
+        self.units = units = kwargs.pop('units', 1)
+        if units <= 0:
+            raise ValueError('Expected positive units, got {}'.format(units))
+        # Keys are unique, so sorting never compares values
+        self._items = tuple(sorted(kwargs.items())) if len(kwargs) > 1 else tuple(kwargs.items())
+        self._kwargs = None
+        self._hash = None
         self._exclusive = exclusive
+        # Number of different resources this request needs, see Chord.request_many
+        self.count = 1
+
+    @property
+    def kwargs(self):
+        # Built on first use, most requests are only hashed and compared by their items
+        if self._kwargs is None:
+            self._kwargs = FrozenKwargs(self._items)
+        return self._kwargs
 
     def is_exclusive(self):
         return self._exclusive
@@ -12,22 +63,34 @@ class Request(object):
     def is_shared(self):
         return not self._exclusive
 
-    def __getattribute__(self, k):
-        try:
-            return object.__getattribute__(self, k)
-        except AttributeError:
-            return self.kwargs.get(k)
+    def __getattr__(self, k):
+        # Only called for names that aren't fields
+        if k.startswith('__') or k in Request.__slots__:
+            raise AttributeError(k)
+        for key, value in self._items:
+            if key == k:
+                return value
+        return None
 
     def __repr__(self):
-        return "<Request {}{} ({})>".format('Exclusive ' if self._exclusive else '', self.cls.__name__, ', '.join('{}={}'.format(k, v) for k, v in self.kwargs.items()))
+        return "<Request {}{}{}{} ({})>".format('Exclusive ' if self._exclusive else '', self.cls.__name__, ' x{}'.format(self.count) if self.count > 1 else '', ' {} units'.format(self.units) if self.units != 1 else '', ', '.join('{}={}'.format(k, v) for k, v in self._items))
 
     def __eq__(self, o):
+        if self is o:
+            return True
         if not isinstance(o, Request):
             return False
-        return self.cls == o.cls and self.kwargs == o.kwargs
+        if self._hash is not None and o._hash is not None and self._hash != o._hash:
+            return False
+        return self.cls == o.cls and self.units == o.units and self._items == o._items
 
     def __ne__(self, o):
         return not self == o
 
     def __hash__(self):
-        return hash((self.cls,) + tuple(self.kwargs.keys()))
+        if self._hash is None:
+            try:
+                self._hash = hash((self.cls, self.units, self._items))
+            except TypeError:
+                self._hash = hash((self.cls, self.units, tuple((key, _hashable(value)) for key, value in self._items)))
+        return self._hash
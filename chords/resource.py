@@ -1,23 +1,104 @@
 from .exceptions import UnsatisfiedResourcesError
+from . import metrics
+
+
+class _Holders(object):
+    """
+    Requests holding a resource. Equal requests share a count, so adding and removing take O(1)
+    """
+    __slots__ = ('_counts', '_total')
+
+    def __init__(self):
+        self._counts = {}
+        self._total = 0
+
+    def add(self, request):
+        self._counts[request] = self._counts.get(request, 0) + 1
+        self._total += 1
+
+    def remove(self, request):
+        count = self._counts[request]
+        if count == 1:
+            del self._counts[request]
+        else:
+            self._counts[request] = count - 1
+        self._total -= 1
+
+    def __contains__(self, request):
+        return request in self._counts
+
+    def __iter__(self):
+        for request, count in self._counts.items():
+            for _ in range(count):
+                yield request
+
+    def __len__(self):
+        return self._total
+
 
 class Resource(object):
-    def __init__(self, cls):
+    _busy_since = None
+
+    def __init__(self, cls, capacity=None):
+        """
+        capacity limits the units shared requests may use at once (unlimited if None), see Request.units.
+        Exclusive requests use the whole resource.
+        """
         self.cls = cls
-        self._requests = []
+        self._requests = _Holders()
         self._exclusive = False
+        self._capacity = capacity
+        self._used = 0
+        self._pool = None
+
+    def set_pool(self, pool):
+        """
+        Set the pool notified whenever this resource is acquired or released
+        """
+        self._pool = pool
+
+    def _state_changed(self, released=False):
+        if self._pool is not None:
+            self._pool.resource_changed(self, released)
+
+    def set_capacity(self, capacity):
+        """
+        Requests already sharing the resource keep it, even if there are more of them than the new capacity
+        """
+        self._capacity = capacity
+        if self._pool is not None:
+            self._pool.capacity_changed(self)
+
+    def get_capacity(self):
+        return self._capacity
+
+    def get_used_units(self):
+        return self._used
 
     def is_exclusive(self):
         return self._exclusive
 
+    def is_full(self):
+        """
+        Whether no more requests can share the resource
+        """
+        return self.is_exclusive() or (self._capacity is not None and self._used >= self._capacity)
+
     def is_shared(self):
-        return len(self._requests) > 0 and not self.is_exclusive()
+        return self._used > 0 and not self.is_exclusive()
+
+    def can_fit(self, request):
+        """
+        Whether request can ever be acquired, once nothing else holds the resource
+        """
+        return request.is_exclusive() or self._capacity is None or request.units <= self._capacity
 
     def can_acquire(self, request):
         if self.is_exclusive():
             return False
         if request.is_exclusive():
-            return len(self._requests) == 0
-        return True
+            return self._used == 0
+        return self._capacity is None or self._used + request.units <= self._capacity
 
     def acquire(self, request):
         if self.is_exclusive():
@@ -26,9 +107,18 @@ class Resource(object):
             if self.is_shared():
                 raise UnsatisfiedResourcesError("Can't acquire resource {} exclusively while shared".format(self))
             self._exclusive = True
-        self._requests.append(request)
+        elif self._capacity is not None and self._used + (1 if request is None else request.units) > self._capacity:
+            raise UnsatisfiedResourcesError("Can't acquire resource {}, not enough of its capacity is free".format(self))
+        else:
+            self._used += 1 if request is None else request.units
+        self._requests.add(request)
+        if self._busy_since is None and metrics.enabled():
+            self._busy_since = metrics.now()
+        self._state_changed()
 
     def release(self, request):
+        if request not in self._requests:
+            raise UnsatisfiedResourcesError("Resource {} isn't held by {}".format(self, request))
         if request.is_exclusive():
             if not self.is_exclusive():
                 raise UnsatisfiedResourcesError("Non exclusive resource {} can't be released from {}".format(self, request))
@@ -36,8 +126,13 @@ class Resource(object):
         else:
             if not self.is_shared():
                 raise UnsatisfiedResourcesError("Non shared Resource {} can't be released from {}".format(self, request))
+            self._used -= request.units
         self._requests.remove(request)
-        
+        if self._busy_since is not None and not self._requests:
+            metrics.observe('resource.busy_seconds', metrics.now() - self._busy_since, resource=repr(self))
+            self._busy_since = None
+        self._state_changed(True)
+
     def matches(self, request):
         return self.cls == request.cls
 
@@ -46,8 +141,8 @@ class ProxyResource(Resource):
     """
     A thin wrapper around an object that turns it into a resource, but proxies all attributes to the original object
     """
-    def __init__(self, obj):
-        super(ProxyResource, self).__init__(obj.__class__)
+    def __init__(self, obj, capacity=None):
+        super(ProxyResource, self).__init__(obj.__class__, capacity)
         super(ProxyResource, self).__setattr__("_obj", obj)
 
     def __getattribute__(self, k):
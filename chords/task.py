@@ -1,9 +1,36 @@
-import inspect, types
+import flux, inspect, time, types, weakref
+from collections import OrderedDict
 from .pool import HashPool
 from .chord import Chord
+from .request import Request
 from .resource import ProxyResource
 from . import registry
 
+# getargspec was removed in python 3.11
+_getargspec = getattr(inspect, 'getfullargspec', None) or inspect.getargspec
+_is_coroutine_function = getattr(inspect, 'iscoroutinefunction', lambda func: False)
+_resources_positions = weakref.WeakKeyDictionary()
+
+def _get_resources_position(func):
+    """
+    Position of func's resources argument (1 for methods, 0 otherwise), or None if it doesn't take one.
+    Introspected once per function.
+    """
+    key = getattr(func, '__func__', func)
+    try:
+        return _resources_positions[key]
+    except (KeyError, TypeError): # Not cached yet, or can't be weakly referenced
+        pass
+    argnames = _getargspec(func)[0]
+    is_method = (argnames and 'self' == argnames[0])
+    resource_index = 1 if is_method else 0
+    res = resource_index if 'resources' in argnames[resource_index:resource_index + 1] else None
+    try:
+        _resources_positions[key] = res
+    except TypeError:
+        pass
+    return res
+
 class Task(object):
     def __init__(self, target=None, name=None):
         """Similar to threads, if target is not None, will run target. You may also override the run method."""
@@ -25,26 +52,26 @@ class Task(object):
         pass
 
     def start(self, *args, **kwargs):
-        resources = kwargs.pop('resources', Chord())
-        resources.request(Task, False, key=self.get_name())
-        self.require(resources, *args, **kwargs)
+        resources = self._get_resources(args, kwargs)
         with resources:
             if self._run is None:
                 return self.run(resources, *args, **kwargs)
+            return self._run(*self._get_run_args(resources, args), **kwargs)
 
-            argnames = inspect.getargspec(self._run)[0]
-            is_method = (argnames and 'self' == argnames[0])
-            resource_index = 1 if is_method else 0
-
-            # if resources is first arg, pass it down. We don't do fancy arg matching yet
-            add_resources = 'resources' in argnames[resource_index:resource_index + 1]
-            if add_resources:
-                if is_method:
-                    args = (args[0], resources) + args[1:]
-                else:
-                    args = (resources,) + args[1:]
+    def _get_resources(self, args, kwargs):
+        resources = kwargs.pop('resources', Chord())
+        resources.request(Task, False, key=self.get_name())
+        self.require(resources, *args, **kwargs)
+        return resources
 
-            return self._run(*args, **kwargs)
+    def _get_run_args(self, resources, args):
+        # if resources is first arg, pass it down. We don't do fancy arg matching yet
+        position = _get_resources_position(self._run)
+        if position is None:
+            return args
+        if position:
+            return (args[0], resources) + args[1:]
+        return (resources,) + args[1:]
 
     def run(self, resources, *args, **kwargs):
         """
@@ -54,14 +81,90 @@ class Task(object):
 
 
 class TaskPool(HashPool):
+    """
+    Task names, added as tasks are requested.
+    Names that aren't held may be evicted: the least recently used ones while there are more than max_size,
+    and names unused for idle_seconds. Both are unlimited by default, see set_limits.
+    A task may also be limited to a number of concurrent runs, see set_max_concurrency.
+    """
+    def __init__(self, max_size=None, idle_seconds=None):
+        super(TaskPool, self).__init__(key=lambda resource: resource._obj)
+        self._last_used = OrderedDict()
+        self._evictions = 0
+        self._max_concurrency = {}
+        self.set_limits(max_size, idle_seconds)
+
+    def set_limits(self, max_size=None, idle_seconds=None):
+        with self.lock:
+            self._max_size = max_size
+            self._idle_seconds = idle_seconds
+            self._evict()
+
+    def set_max_concurrency(self, name, max_concurrency):
+        """
+        Allow at most max_concurrency runs of the named task at once (unlimited if None)
+        """
+        with self.lock:
+            if max_concurrency is None:
+                self._max_concurrency.pop(name, None)
+            else:
+                self._max_concurrency[name] = max_concurrency
+            if name in self._resources:
+                self._resources[name].set_capacity(max_concurrency)
+
+    def get_max_concurrency(self, name):
+        return self._max_concurrency.get(name)
+
     def add(self, task_or_str):
         if isinstance(task_or_str, Task):
             task_or_str = task_or_str.get_name()
-        self._resources[task_or_str] = ProxyResource(task_or_str)
+        with self.lock:
+            if task_or_str not in self._resources:
+                super(TaskPool, self).add(ProxyResource(task_or_str, self._max_concurrency.get(task_or_str)))
+            self._touch(task_or_str)
+            self._evict(keep=task_or_str)
+
+    def remove(self, resource):
+        with self.lock:
+            super(TaskPool, self).remove(resource)
+            self._last_used.pop(self._key(resource), None)
+
+    def get_stats(self):
+        with self.lock:
+            return dict(size=len(self._resources), evictions=self._evictions)
+
+    def _touch(self, name):
+        self._last_used.pop(name, None)
+        self._last_used[name] = flux.current_timeline.time()
+
+    def _evict(self, keep=None):
+        if self._max_size is None and self._idle_seconds is None:
+            return
+        now = flux.current_timeline.time()
+        size = len(self._resources)
+        evicted = []
+        for name, last_used in self._last_used.items(): # Least recently used first
+            over_size = self._max_size is not None and size > self._max_size
+            idle = self._idle_seconds is not None and now - last_used >= self._idle_seconds
+            if not over_size and not idle:
+                break
+            resource = self._resources[name]
+            if name == keep or resource.is_exclusive() or resource.is_shared():
+                continue
+            evicted.append(resource)
+            size -= 1
+        for resource in evicted:
+            self.remove(resource)
+        self._evictions += len(evicted)
+
+    def get_request_key(self, request):
+        # Missing keys are added on find, so keyed requests only ever match their own task
+        return request.kwargs.get('key')
 
     def find(self, request):
-        if 'key' in request.kwargs and request.kwargs.get('key') not in self._resources:
-            self.add(request.kwargs.get('key'))
+        with self.lock:
+            if 'key' in request.kwargs:
+                self.add(request.kwargs.get('key'))
         return super(TaskPool, self).find(request)
 
 
@@ -82,45 +185,89 @@ def get_default_task_class():
 class TaskFactory(object):
     def __init__(self, func):
         self._task_class = None
+        self._max_concurrency = None
+        self._priority = None
+        self._timeout = None
+        self._deadline = None
         self._requirements = []
         self._func = func
+        self._is_coroutine = _is_coroutine_function(func)
         self.__name__ = self._func.__name__
         self.__doc__ = self._func.__doc__
     
     def add_requirement(self, cls, exclusive, **kwargs):
-        self._requirements.append(dict(cls=cls, exclusive=exclusive, kwargs=kwargs))
+        # Requests are immutable, so every call's chord can share them
+        self._requirements.append(Request(cls, exclusive, **kwargs))
+
+    def set_priority(self, priority):
+        """
+        Priority of the task's chords. The highest one given by task or requires is kept.
+        """
+        if self._priority is None or priority > self._priority:
+            self._priority = priority
+
+    def _get_task_class(self):
+        if self._task_class is not None:
+            return self._task_class
+        if self._is_coroutine:
+            from .more.asyncio_task import AsyncTask
+            return AsyncTask
+        return get_default_task_class()
     
     def __call__(self, *args, **kwargs):
-        task_class = self._task_class or get_default_task_class()
+        if self._max_concurrency is not None:
+            pool = registry.get_pool(Task)
+            if pool.get_max_concurrency(self.__name__) != self._max_concurrency:
+                pool.set_max_concurrency(self.__name__, self._max_concurrency)
+        task_class = self._get_task_class()
         task = task_class(self._func, name=self.__name__)
-        resources = Chord()
-        for requirement in self._requirements:
-            resources.request(requirement['cls'], requirement['exclusive'], **requirement['kwargs'])
+        deadline = None if self._deadline is None else time.time() + self._deadline
+        resources = Chord(priority=self._priority or 0, timeout=self._timeout, deadline=deadline)
+        resources.add_requests(self._requirements)
         return task.start(resources=resources, *args, **kwargs)
 
     def __get__(self, instance, cls):
         return types.MethodType(self, instance or cls)
 
 
-def task(name=None, task_class=None):
-    if task_class is None:
-        task_class = get_default_task_class()
+def task(name=None, task_class=None, max_concurrency=None, priority=None, timeout=None, deadline=None):
+    """
+    max_concurrency limits the number of concurrent runs of the task, by giving its Task resource that capacity.
+    priority is the priority of the task's chords, see PriorityFairness.
+    timeout limits how long each run waits for its resources, see Chord.
+    deadline gives each run a deadline that many seconds after it is called, which also limits its subtasks.
+    """
     def wrapper(func):
         if not isinstance(func, TaskFactory):
             func = TaskFactory(func)
         if name:
             func.__name__ = name
+        if max_concurrency is not None:
+            func._max_concurrency = max_concurrency
+        if priority is not None:
+            func.set_priority(priority)
+        if timeout is not None:
+            func._timeout = timeout
+        if deadline is not None:
+            func._deadline = deadline
         if task_class:
             func._task_class = task_class
+        elif not func._is_coroutine:
+            func._task_class = get_default_task_class()
         return func
     return wrapper
 
 
-def requires(cls, exclusive=False, **kwargs):
+def requires(cls, exclusive=False, priority=None, **kwargs):
+    """
+    priority, if given, is the priority of the task's chords, as in task
+    """
     def wrapper(func):
         if not isinstance(func, TaskFactory):
             task = TaskFactory(func)
             func = task
         func.add_requirement(cls, exclusive, **kwargs)
+        if priority is not None:
+            func.set_priority(priority)
         return func
     return wrapper
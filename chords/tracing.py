@@ -0,0 +1,33 @@
+"""
+Tracing of scheduling events: chords acquiring and releasing resources, and fairness policy iterations.
+Events are only built when someone listens, either debug logging of the 'Chords' logger or a tracer,
+so callers check enabled() first and tracing costs nothing otherwise.
+"""
+import logging
+
+_logger = logging.getLogger('Chords')
+_tracer = None
+
+def set_tracer(tracer):
+    """
+    tracer(event, fields) is called with the name and fields of every event, e.g. ('acquire', {'chord': ..., 'resources': ...}).
+    Set None to stop tracing.
+    """
+    global _tracer
+    _tracer = tracer
+
+def get_tracer():
+    return _tracer
+
+def enabled():
+    return _tracer is not None or _logger.isEnabledFor(logging.DEBUG)
+
+def trace(event, message, **fields):
+    """
+    Send an event to the tracer, and log message formatted with its fields if debug logging is enabled
+    """
+    tracer = _tracer
+    if tracer is not None:
+        tracer(event, fields)
+    if _logger.isEnabledFor(logging.DEBUG):
+        _logger.debug(message.format(**fields))
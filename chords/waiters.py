@@ -0,0 +1,100 @@
+"""
+Strategies used by chords to wait until all of their resources can be acquired.
+A waiter's wait(predicate, timeout_seconds=None) returns True once predicate is true,
+or False if it still isn't after timeout_seconds. Predicates are tried at least once.
+"""
+import threading, time
+import waiting
+
+
+class PollingWaiter(object):
+    """
+    Periodically retry acquiring, using waiting.wait. This is the default.
+    """
+    def __init__(self, sleep_seconds=None):
+        self._sleep_seconds = sleep_seconds
+
+    def wait(self, predicate, timeout_seconds=None):
+        kwargs = {}
+        if timeout_seconds is not None:
+            kwargs.update(timeout_seconds=timeout_seconds)
+        if self._sleep_seconds is not None:
+            kwargs.update(sleep_seconds=self._sleep_seconds)
+        try:
+            waiting.wait(predicate, **kwargs)
+        except waiting.TimeoutExpired:
+            return False
+        return True
+
+    def notify(self):
+        pass
+
+
+class ConditionWaiter(object):
+    """
+    Sleep on a condition variable, and only retry acquiring when notified that resources were released,
+    or that a waiting chord was acquired or failed by the fairness policy.
+    Predicates run outside of the condition, so threads waiting on unrelated resources don't block each other.
+    A notification arriving while a predicate runs makes it retry immediately, so none are missed.
+    """
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._generation = 0
+
+    def wait(self, predicate, timeout_seconds=None):
+        deadline = None if timeout_seconds is None else time.time() + timeout_seconds
+        while True:
+            with self._condition:
+                generation = self._generation
+            if predicate():
+                return True
+            with self._condition:
+                while generation == self._generation:
+                    remaining = get_remaining(deadline)
+                    if remaining is not None and remaining <= 0:
+                        return False
+                    self._condition.wait(remaining)
+
+    def notify(self):
+        with self._condition:
+            self._generation += 1
+            self._condition.notify_all()
+
+
+_waiter = PollingWaiter()
+_listeners = []
+
+def set_waiter(waiter):
+    global _waiter
+    _waiter = waiter
+
+def get_waiter():
+    return _waiter
+
+def get_remaining(deadline):
+    """
+    Seconds left until deadline, a time.time() timestamp (None if deadline is None)
+    """
+    if deadline is None:
+        return None
+    return max(deadline - time.time(), 0)
+
+def wait(predicate, timeout_seconds=None):
+    """
+    Wait until predicate is true, or timeout_seconds passed. Returns whether predicate is true.
+    """
+    return _waiter.wait(predicate, timeout_seconds)
+
+def add_listener(listener):
+    """
+    Call listener whenever waiting chords are notified, in addition to the current waiter
+    """
+    _listeners.append(listener)
+
+def remove_listener(listener):
+    _listeners.remove(listener)
+
+def notify():
+    _waiter.notify()
+    for listener in _listeners:
+        listener()
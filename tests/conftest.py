@@ -1,8 +1,14 @@
-import sys, pytest
-from chords import registry
+import sys, pytest, flux
+from chords import registry, waiters
+from chords.fairness_policies import _fairness
 from chords.pool import Pool
 from chords.resource import Resource
 
+# async syntax can't be compiled by older interpreters, so the module can't guard itself
+collect_ignore = []
+if sys.version_info < (3, 5):
+    collect_ignore.append('more/test_asyncio.py')
+
 class DummyResource(Resource):
     def __init__(self, cls, val):
         Resource.__init__(self, cls)
@@ -42,3 +48,23 @@ def initiated_registry(request):
         del registry._registry[int]
         del registry._registry[float]
     return registry
+
+@pytest.fixture
+def timeline(request):
+    old_timeline = flux.current_timeline.get()
+    timeline = flux.Timeline()
+    timeline.set_time_factor(0)
+    flux.current_timeline.set(timeline)
+    request.addfinalizer(lambda: flux.current_timeline.set(old_timeline))
+    return timeline
+
+@pytest.fixture
+def condition_waiter(request):
+    old_waiter = waiters.get_waiter()
+    waiter = waiters.ConditionWaiter()
+    waiters.set_waiter(waiter)
+    @request.addfinalizer
+    def restore():
+        waiters.set_waiter(old_waiter)
+        assert len(_fairness._queue) == 0
+    return waiter
@@ -0,0 +1,111 @@
+import asyncio
+import pytest
+from chords.chord import Chord
+from chords.exceptions import AcquireTimeoutError
+from chords.fairness_policies import _fairness
+from chords.task import requires, task
+from chords.more.asyncio_task import AsyncTask
+
+
+@pytest.fixture(autouse=True)
+def ensure_cleared(request):
+    @request.addfinalizer
+    def check():
+        assert len(_fairness._queue) == 0
+
+
+def test_async_with(initiated_registry):
+    chord = Chord()
+    chord.request(int, True, max_value=1)
+
+    async def run():
+        async with chord:
+            assert chord.is_satisfied()
+            return chord.get(int).get_value()
+
+    assert asyncio.run(run()) == 1
+    assert not chord.is_satisfied()
+
+
+def test_async_with_waits_for_release(initiated_registry):
+    other = Chord()
+    other.request(int, True, max_value=1)
+    assert other.acquire()
+
+    async def run():
+        chord = Chord()
+        chord.request(int, True, max_value=1)
+        asyncio.get_running_loop().call_later(0.05, other.release)
+        async with chord:
+            assert not other.is_satisfied()
+            return chord.get(int).get_value()
+
+    assert asyncio.run(run()) == 1
+
+
+def test_async_with_releases_on_error(initiated_registry):
+    chord = Chord()
+    chord.request(int, True, max_value=1)
+
+    async def run():
+        async with chord:
+            raise ValueError()
+
+    with pytest.raises(ValueError):
+        asyncio.run(run())
+    assert not chord.is_satisfied()
+
+
+@pytest.mark.parametrize('exclusive', [True, False])
+def test_many_waiting_tasks(initiated_registry, exclusive):
+    running = []
+    max_running = []
+
+    @requires(int, exclusive, max_value=1)
+    async def run(resources, index):
+        running.append(index)
+        max_running.append(len(running))
+        await asyncio.sleep(0)
+        running.remove(index)
+        return resources.get(int).get_value()
+
+    async def run_all():
+        return await asyncio.gather(*[run(None, i) for i in range(50)])
+
+    assert asyncio.run(run_all()) == [1] * 50
+    assert max(max_running) == (1 if exclusive else 50)
+
+
+def test_task_decorator_on_coroutine(initiated_registry):
+    @task(name='named')
+    async def run():
+        return 'done'
+
+    assert asyncio.run(run()) == 'done'
+
+
+def test_async_task_subclass(initiated_registry):
+    class TestTask(AsyncTask):
+        def require(self, resources):
+            resources.request(float, True, max_value=1)
+
+        async def run(self, resources):
+            return resources.get(float).get_value()
+
+    assert asyncio.run(TestTask().start()) == 1
+
+
+def test_async_with_timeout(initiated_registry):
+    other = Chord()
+    other.request(int, True, max_value=1)
+    assert other.acquire()
+    chord = Chord(timeout=0.01)
+    chord.request(int, True, max_value=1)
+
+    async def run():
+        async with chord:
+            pass
+
+    with pytest.raises(AcquireTimeoutError):
+        asyncio.run(run())
+    other.release()
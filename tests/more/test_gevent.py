@@ -4,6 +4,7 @@ except ImportError:
     pass
 else:
 
+    import time
     import pytest, flux
     from chords.task import set_default_task_class, get_default_task_class, requires
     from chords.more.gevent_task import GeventTask
@@ -22,7 +23,7 @@ else:
         set_default_task_class(GeventTask)
         @request.addfinalizer
         def restore():
-            flux.current_timeline.set(old_class)
+            set_default_task_class(old_class)
 
 
     @pytest.mark.parametrize('exclusive', [True, False])
@@ -55,3 +56,49 @@ else:
         assert res2.get() == 2
         assert len(start_counter) == 2
         assert len(end_counter) == 2
+
+    def test_gevent_waiter_wakes_on_notify():
+        from chords.more.gevent_waiter import GeventWaiter
+        waiter = GeventWaiter()
+        ready = []
+        attempts = []
+
+        def predicate():
+            attempts.append(True)
+            return bool(ready)
+
+        greenlet = gevent.spawn(waiter.wait, predicate)
+        gevent.sleep(0)
+        assert len(attempts) == 1
+        gevent.sleep(0.01)
+        assert len(attempts) == 1, 'Waiter should sleep until notified'
+        ready.append(True)
+        waiter.notify()
+        assert greenlet.get(timeout=1) is True
+        assert len(attempts) == 2
+
+    def test_gevent_waiter_timeout():
+        from chords.more.gevent_waiter import GeventWaiter
+        waiter = GeventWaiter()
+        assert waiter.wait(lambda: False, timeout_seconds=0.01) is False
+        assert waiter.wait(lambda: True, timeout_seconds=0) is True
+
+    def test_interleaved_tasks_keep_their_deadlines(initiated_registry):
+        from chords.chord import get_deadline
+        from chords.task import task
+
+        @task(deadline=30)
+        def short_task():
+            flux.current_timeline.sleep(0)
+            return get_deadline()
+
+        @task(deadline=60)
+        def long_task():
+            flux.current_timeline.sleep(0)
+            return get_deadline()
+
+        start = time.time()
+        short_greenlet, long_greenlet = short_task(), long_task()
+        assert start + 30 <= short_greenlet.get() < start + 40
+        assert start + 60 <= long_greenlet.get() < start + 70
+        assert get_deadline() is None
@@ -0,0 +1,82 @@
+import multiprocessing
+import pytest
+from chords import registry, waiters
+from chords.chord import Chord
+from chords.resource import Resource
+from chords.more.multiprocess import SharedState, SharedPool, SharedResource, SharedWaiter
+
+# Start methods and contexts were added in python 3.4
+_start_methods = getattr(multiprocessing, 'get_all_start_methods', list)()
+pytestmark = pytest.mark.skipif('fork' not in _start_methods, reason='Needs fork')
+
+PROCESSES = 4
+ITERATIONS = 200
+
+
+class Counter(SharedResource):
+    def __init__(self, name):
+        super(Counter, self).__init__(Counter)
+        self.name = name
+
+
+@pytest.fixture
+def context():
+    return multiprocessing.get_context('fork')
+
+
+@pytest.fixture
+def shared_pool(request, context):
+    state = SharedState(2, context)
+    pool = SharedPool(state)
+    for name in range(2):
+        pool.add(Counter(name))
+    registry.register(Counter, pool)
+    old_waiter = waiters.get_waiter()
+    waiters.set_waiter(SharedWaiter(state))
+    @request.addfinalizer
+    def restore():
+        registry.unregister(Counter)
+        waiters.set_waiter(old_waiter)
+    return pool
+
+
+def _increment(values):
+    for _ in range(ITERATIONS):
+        chord = Chord()
+        chord.request(Counter, True)
+        chord.request(Counter, True)
+        with chord:
+            # Not atomic, only safe while holding both counters
+            value = values[0]
+            values[0] = value + 1
+
+
+def test_exclusive_across_processes(shared_pool, context):
+    values = context.RawArray('l', 1)
+    processes = [context.Process(target=_increment, args=(values,)) for _ in range(PROCESSES)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(30)
+        assert process.exitcode == 0
+    assert values[0] == PROCESSES * ITERATIONS
+    assert not any(resource.is_exclusive() for resource in shared_pool)
+
+def test_shared_state(shared_pool):
+    chord = Chord()
+    chord.request(Counter, False)
+    with chord:
+        resource = chord.get(Counter)
+        assert resource.is_shared()
+        assert resource.get_used_units() == 1
+    assert not resource.is_shared()
+    assert shared_pool._state.get_generation() == 1
+
+def test_shared_pool_only_takes_shared_resources(shared_pool):
+    with pytest.raises(TypeError):
+        SharedPool(SharedState(1)).add(Resource(Counter))
+
+def test_shared_waiter_timeout(context):
+    waiter = SharedWaiter(SharedState(1, context))
+    assert not waiter.wait(lambda: False, timeout_seconds=0.01)
+    assert waiter.wait(lambda: True, timeout_seconds=0)
@@ -0,0 +1,45 @@
+try:
+    import numpy
+except ImportError:
+    pass
+else:
+
+    import pytest
+    from chords.request import Request
+    from chords.pool import WeightedRandomPool
+    from chords.more.numpy_scoring import batch_score
+    from ..conftest import DummyResource
+
+    @pytest.fixture
+    def pool():
+        pool = WeightedRandomPool()
+        pool._resources = [DummyResource(int, i) for i in range(1, 100)]
+        return pool
+
+    def test_batch_score_weights(pool):
+        @batch_score('_value')
+        def cubed(values):
+            return values ** 3
+
+        largest_number_first = 0
+        for _ in range(100):
+            result = [x.get_value() for x in pool.find(Request(int, min_value=5, max_value=10, score_method=cubed))]
+            assert sorted(result) == [5, 6, 7, 8, 9, 10]
+            if result[0] == 10:
+                largest_number_first += 1
+
+        assert largest_number_first >= 20 and largest_number_first <= 50
+
+    def test_batch_score_zero_weights(pool):
+        only_seven = batch_score('_value')(lambda values: numpy.where(values == 7, 1.0, -1.0))
+        result = [x.get_value() for x in pool.find(Request(int, min_value=5, max_value=10, score_method=only_seven))]
+        assert result == [7, 5, 6, 8, 9, 10]
+
+    def test_batch_score_wrong_length(pool):
+        wrong = batch_score('_value')(lambda values: numpy.ones(2))
+        with pytest.raises(ValueError):
+            list(pool.find(Request(int, min_value=5, max_value=10, score_method=wrong)))
+
+    def test_batch_score_single_resource():
+        doubled = batch_score('_value')(lambda values: values * 2)
+        assert doubled(DummyResource(int, 4)) == 8
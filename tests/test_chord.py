@@ -1,7 +1,8 @@
-import pytest, waiting
-from chords.chord import Chord
+import threading, time, pytest, waiting
+from chords import fairness_policies, metrics
+from chords.chord import Chord, _LocalDeadline, get_deadline
 from chords.fairness_policies import _fairness
-from chords.exceptions import UnsatisfiedResourcesError
+from chords.exceptions import AcquireTimeoutError, UnsatisfiedResourcesError
 
 @pytest.fixture
 def chord(request, initiated_registry):
@@ -43,6 +44,13 @@ def test_acquire_multiple_with_get(chord, exclusive):
     assert chord.get(int, max_value=1).get_value() == 1
     assert chord.get(int, min_value=2).get_value() == 2
 
+def test_get_with_requested_kwargs_reuses_request(chord, monkeypatch):
+    chord.request(int, True, max_value=2)
+    assert chord.acquire()
+    monkeypatch.setattr('chords.chord.Request', None)
+    assert 1 <= chord.get(int, max_value=2).get_value() <= 2
+    chord.release()
+
 @pytest.mark.parametrize('exclusive', [True, False])
 def test_acquire_multiple_with_get_too_many_value(chord, exclusive):
     chord.request(int, exclusive, max_value=2)
@@ -207,3 +215,175 @@ def test_fail_get_no_matches(chord):
     with chord:
         with pytest.raises(UnsatisfiedResourcesError):
             chord.get(int, min_value=3)
+
+def test_acquire_many_equal_requests(chord):
+    for _ in range(10):
+        chord.request(int, True, max_value=20)
+    assert chord.acquire()
+    assert sorted(r.get_value() for r in chord.find(int)) == list(range(1, 11))
+
+def test_acquire_equal_requests_with_different_exclusivity(chord):
+    chord.request(int, True, max_value=2)
+    chord.request(int, False, max_value=2)
+    assert chord.acquire()
+    resources = chord.find(int)
+    assert sorted(r.get_value() for r in resources) == [1, 2]
+    assert [r.is_exclusive() for r in resources] == [True, False]
+
+def test_fail_acquire_not_enough_resources(chord, initiated_registry):
+    for _ in range(3):
+        chord.request(int, True, max_value=2)
+    assert not chord.acquire()
+    assert not chord.is_satisfied()
+    assert all(not r.is_exclusive() for r in initiated_registry.get_pool(int))
+
+@pytest.mark.parametrize('exclusive', [True, False])
+def test_request_many(chord, exclusive):
+    chord.request_many(int, 3, exclusive, max_value=5)
+    chord.request(float, exclusive, max_value=1)
+    assert len(chord._requests) == 2
+    with chord:
+        resources = chord.get(int)
+        assert sorted(r.get_value() for r in resources) == [1, 2, 3]
+        assert len(chord.find(int)) == 3
+        assert [r.get_value() for r in chord.get(int, min_value=3)] == [3]
+        assert chord.get(float).get_value() == 1
+    assert not chord.is_satisfied()
+
+def test_request_many_with_equal_request(chord):
+    chord.request_many(int, 2, True, max_value=3)
+    chord.request(int, True, max_value=3)
+    assert chord.acquire()
+    assert sorted(r.get_value() for r in chord.find(int)) == [1, 2, 3]
+    with pytest.raises(UnsatisfiedResourcesError):
+        chord.get(int)
+    chord.release()
+
+def test_fail_request_many_not_enough_resources(chord):
+    chord.request_many(int, 3, True, max_value=2)
+    assert not chord.acquire()
+
+def test_fail_request_many_bad_count(chord):
+    with pytest.raises(ValueError):
+        chord.request_many(int, 0)
+
+
+def _hold_int():
+    holder = Chord()
+    holder.request(int, True, max_value=1)
+    assert holder.acquire()
+    return holder
+
+def test_timeout(chord, request):
+    sink = metrics.enable()
+    request.addfinalizer(lambda: metrics.set_sink(None))
+    holder = _hold_int()
+    chord = Chord(timeout=0.01)
+    chord.request(int, True, max_value=1)
+    chord.request(float, True, max_value=1)
+    with pytest.raises(AcquireTimeoutError):
+        with chord:
+            pass
+    assert not chord.is_satisfied()
+    assert sink.get_counter('chord.timeouts', policy='BestEffortFairness') == 1
+    holder.release()
+    other = Chord()
+    other.request(float, True, max_value=1)
+    assert other.acquire()
+    other.release()
+
+def test_acquire_after_timeout(chord):
+    holder = _hold_int()
+    chord = Chord(timeout=0.01)
+    chord.request(int, True, max_value=1)
+    with pytest.raises(AcquireTimeoutError):
+        with chord:
+            pass
+    holder.release()
+    assert chord.acquire()
+    chord.release()
+
+def test_no_timeout_if_free(chord):
+    chord = Chord(timeout=0)
+    chord.request(int, True, max_value=1)
+    with chord:
+        assert chord.is_satisfied()
+
+def test_deadline_propagates_to_inner_chords(chord):
+    holder = _hold_int()
+    outer = Chord(deadline=time.time() - 1)
+    outer.request(float, True, max_value=1)
+    with outer:
+        assert get_deadline() == outer._deadline
+        inner = Chord(timeout=60)
+        inner.request(int, True, max_value=1)
+        with pytest.raises(AcquireTimeoutError):
+            with inner:
+                pass
+    assert get_deadline() is None
+    holder.release()
+
+def test_local_deadline_reset_out_of_order():
+    deadline = _LocalDeadline()
+    outer = deadline.set(1.0)
+    inner = deadline.set(0.5)
+    deadline.reset(outer)
+    assert deadline.get() == 0.5
+    deadline.reset(inner)
+    assert deadline.get() is None
+
+def test_timeout_does_not_propagate(chord):
+    holder = _hold_int()
+    outer = Chord(timeout=0.01)
+    outer.request(float, True, max_value=1)
+    with outer:
+        assert get_deadline() is None
+        time.sleep(0.02)
+        inner = Chord(timeout=0.05)
+        inner.request(int, True, max_value=1)
+        start = time.time()
+        with pytest.raises(AcquireTimeoutError):
+            with inner:
+                pass
+        assert time.time() - start >= 0.05
+    holder.release()
+
+def test_timed_out_chord_is_not_acquired_by_running_iteration(chord, request):
+    policy = fairness_policies.BestEffortFairness(iteration_minimum=None)
+    fairness_policies.set_fairness_policy(policy)
+    request.addfinalizer(lambda: fairness_policies.set_fairness_policy(_fairness))
+    holder = _hold_int()
+    waiter = Chord(timeout=0.05)
+    waiter.request(int, True, max_value=1)
+    timed_out = threading.Event()
+    errors = []
+
+    def wait():
+        try:
+            with waiter:
+                pass
+        except AcquireTimeoutError as e:
+            errors.append(e)
+        timed_out.set()
+
+    waiter_thread = threading.Thread(target=wait)
+    waiter_thread.start()
+    waiting.wait(policy.has_waiting_chords, timeout_seconds=5)
+
+    # The releasing thread's iteration takes the waiting chords, and only tries them after the timeout
+    get_chords = policy._chords
+    def delayed_chords():
+        chords = get_chords()
+        timed_out.wait(5)
+        return chords
+    policy._chords = delayed_chords
+    release_thread = threading.Thread(target=holder.release)
+    release_thread.start()
+    waiter_thread.join()
+    release_thread.join()
+
+    assert len(errors) == 1
+    assert not waiter.is_satisfied()
+    assert not policy.has_waiting_chords()
+    other = _hold_int()
+    other.release()
@@ -0,0 +1,221 @@
+import pytest, flux
+from chords import fairness_policies
+from chords.chord import Chord
+
+
+@pytest.fixture(params=[fairness_policies.BestEffortFairness,
+                        fairness_policies.StrictFIFOFairness,
+                        fairness_policies.ExclusiveResourceBlocksFairness,
+                        fairness_policies.PriorityFairness])
+def policy(request, initiated_registry, timeline):
+    return _install_policy(request, request.param())
+
+
+@pytest.fixture
+def priority_policy(request, initiated_registry, timeline):
+    return _install_policy(request, fairness_policies.PriorityFairness(aging_rate=1))
+
+
+@pytest.fixture
+def state_driven_policy(request, initiated_registry, timeline):
+    return _install_policy(request, fairness_policies.BestEffortFairness(iteration_minimum=None))
+
+
+def _install_policy(request, policy):
+    old_policy = fairness_policies._fairness
+    fairness_policies.set_fairness_policy(policy)
+    request.addfinalizer(lambda: fairness_policies.set_fairness_policy(old_policy))
+    return policy
+
+
+class CountingChord(Chord):
+    def __init__(self, priority=0):
+        super(CountingChord, self).__init__(priority)
+        self.attempts = 0
+
+    def acquire(self):
+        self.attempts += 1
+        return super(CountingChord, self).acquire()
+
+
+def _hold(cls):
+    holder = Chord()
+    holder.request(cls, True, max_value=1)
+    assert holder.acquire()
+    return holder
+
+
+def _wait(policy, cls, priority=0):
+    chord = CountingChord(priority)
+    chord.request(cls, True, max_value=1)
+    policy.add(chord)
+    return chord
+
+
+def test_new_chords_are_tried(policy):
+    int_holder = _hold(int)
+    chord = _wait(policy, int)
+    policy.try_acquire_chords()
+    assert chord.attempts == 1
+    assert not chord.is_satisfied()
+    int_holder.release()
+    policy.try_acquire_chords()
+    assert chord.is_satisfied()
+    assert not policy.has_waiting_chords()
+    chord.release()
+
+
+def test_release_only_retries_chords_waiting_on_pool(policy):
+    int_holder, float_holder = _hold(int), _hold(float)
+    float_chord, int_chord = _wait(policy, float), _wait(policy, int)
+    policy.try_acquire_chords()
+    int_chord.attempts = float_chord.attempts = 0
+
+    float_holder.release()
+    policy.try_acquire_chords()
+    assert float_chord.is_satisfied()
+    if policy.INCREMENTAL:
+        assert int_chord.attempts == 0
+    else:
+        assert int_chord.attempts == 1
+    float_chord.release()
+    int_holder.release()
+    policy.try_acquire_chords()
+    assert int_chord.is_satisfied()
+    int_chord.release()
+
+
+def test_iteration_by_time_retries_all_chords(policy):
+    int_holder, float_holder = _hold(int), _hold(float)
+    int_chord, float_chord = _wait(policy, int), _wait(policy, float)
+    policy.try_acquire_chords()
+    policy.try_acquire_chords()
+    assert int_chord.attempts == 1 and float_chord.attempts <= 1
+
+    flux.current_timeline.sleep(fairness_policies.ITERATION_MINIMUM)
+    policy.try_acquire_chords()
+    assert int_chord.attempts == 2
+    for chord in (int_chord, float_chord):
+        policy.remove(chord)
+    int_holder.release()
+    float_holder.release()
+
+
+def test_state_driven_policy_ignores_time(state_driven_policy):
+    policy = state_driven_policy
+    int_holder = _hold(int)
+    chord = _wait(policy, int)
+    policy.try_acquire_chords()
+    flux.current_timeline.sleep(fairness_policies.ITERATION_MINIMUM)
+    policy.try_acquire_chords()
+    assert chord.attempts == 1
+
+    int_holder.release()
+    assert chord.attempts == 2
+    assert chord.is_satisfied()
+    chord.release()
+
+
+def test_release_hands_resources_to_waiting_chords(policy):
+    int_holder = _hold(int)
+    chord = _wait(policy, int)
+    policy.try_acquire_chords()
+    assert not chord.is_satisfied()
+    int_holder.release()
+    assert chord.is_satisfied()
+    assert not policy.has_waiting_chords()
+    chord.release()
+
+
+def test_released_units_retry_waiting_chords(state_driven_policy):
+    policy = state_driven_policy
+    holders = []
+    for units in (2, 1):
+        holder = Chord()
+        holder.request(int, False, max_value=1, units=units)
+        assert holder.acquire()
+        holders.append(holder)
+        holder.get(int).set_capacity(4)
+    chord = CountingChord()
+    chord.request(int, False, max_value=1, units=2)
+    policy.add(chord)
+    policy.try_acquire_chords()
+    assert not chord.is_satisfied()
+
+    holders[0].release()
+    assert chord.is_satisfied()
+    chord.release()
+    holders[1].release()
+
+
+def test_priority_chords_acquire_first(priority_policy):
+    policy = priority_policy
+    int_holder = _hold(int)
+    low, high = _wait(policy, int), _wait(policy, int, priority=5)
+    policy.try_acquire_chords()
+    assert list(policy) == [high, low]
+
+    int_holder.release()
+    assert high.is_satisfied() and not low.is_satisfied()
+    high.release()
+    assert low.is_satisfied()
+    low.release()
+    assert not policy.has_waiting_chords()
+
+
+def test_waiting_chords_age(priority_policy):
+    policy = priority_policy
+    int_holder = _hold(int)
+    low = _wait(policy, int)
+    flux.current_timeline.sleep(10)
+    high = _wait(policy, int, priority=5)
+    policy.try_acquire_chords()
+
+    int_holder.release()
+    assert low.is_satisfied() and not high.is_satisfied()
+    low.release()
+    high.release()
+
+
+@pytest.fixture
+def sharded_policy(request, initiated_registry, timeline):
+    return _install_policy(request, fairness_policies.ShardedFairness(fairness_policies.StrictFIFOFairness))
+
+
+def test_sharded_release_only_retries_its_shard(sharded_policy):
+    policy = sharded_policy
+    policy.set_class_policy(float, fairness_policies.PriorityFairness)
+    int_holder, float_holder = _hold(int), _hold(float)
+    int_chord, float_chord = _wait(policy, int), _wait(policy, float)
+    policy.try_acquire_chords()
+    int_chord.attempts = float_chord.attempts = 0
+    shards = policy.get_shards()
+    assert type(shards[frozenset([int])]) is fairness_policies.StrictFIFOFairness
+    assert type(shards[frozenset([float])]) is fairness_policies.PriorityFairness
+
+    float_holder.release()
+    assert float_chord.is_satisfied()
+    assert int_chord.attempts == 0
+    float_chord.release()
+
+    int_holder.release()
+    assert int_chord.is_satisfied()
+    assert not policy.has_waiting_chords()
+    int_chord.release()
+
+
+def test_sharded_chords_requesting_many_classes(sharded_policy):
+    policy = sharded_policy
+    int_holder, float_holder = _hold(int), _hold(float)
+    chord = CountingChord()
+    chord.request(int, True, max_value=1)
+    chord.request(float, True, max_value=1)
+    policy.add(chord)
+    policy.try_acquire_chords()
+    assert list(policy) == [chord]
+
+    int_holder.release()
+    assert chord.attempts == 2 and not chord.is_satisfied()
+    float_holder.release()
+    assert chord.is_satisfied()
+    chord.release()
@@ -0,0 +1,109 @@
+import gc, json, weakref
+import pytest
+from chords import metrics
+from chords.chord import Chord
+from chords.request import Request
+from chords.resource import Resource
+
+
+@pytest.fixture
+def sink(request, timeline):
+    sink = metrics.enable()
+    request.addfinalizer(lambda: metrics.set_sink(None))
+    return sink
+
+
+def test_disabled_by_default():
+    assert not metrics.enabled()
+
+def test_histogram():
+    histogram = metrics.Histogram()
+    for value in (0.001, 0.002, 0.003, 1):
+        histogram.add(value)
+    assert (histogram.count, histogram.min, histogram.max) == (4, 0.001, 1)
+    assert histogram.sum == pytest.approx(1.006)
+    assert 0.002 <= histogram.percentile(0.5) < 0.004
+    assert histogram.percentile(1) == 1
+    assert metrics.Histogram().percentile(0.5) is None
+
+def test_wait_and_hold_seconds(initiated_registry, sink, timeline):
+    holder = Chord()
+    holder.request(int, True, max_value=1)
+    waiter = Chord()
+    waiter.request(int, True, max_value=1)
+    with holder:
+        assert not waiter._try_acquire()
+        timeline.sleep(2)
+    assert waiter._try_acquire()
+    timeline.sleep(3)
+    waiter.release()
+    wait = sink.get_histogram('chord.wait_seconds')
+    hold = sink.get_histogram('chord.hold_seconds')
+    assert (wait.count, wait.max) == (2, 2)
+    assert (hold.count, hold.sum) == (2, 5)
+
+def test_acquire_attempts_and_failures(initiated_registry, sink):
+    holder = Chord()
+    holder.request(int, True, max_value=1)
+    other = Chord()
+    other.request(int, True, max_value=1)
+    with holder:
+        assert not other.acquire()
+    assert sink.get_counter('chord.acquire_attempts', policy='BestEffortFairness') == 2
+    assert sink.get_counter('chord.acquire_failures', policy='BestEffortFairness') == 1
+
+def test_resource_utilisation(sink, timeline):
+    resource = Resource(int)
+    request = Request(int)
+    timeline.sleep(1)
+    resource.acquire(request)
+    resource.acquire(request)
+    timeline.sleep(2)
+    resource.release(request)
+    timeline.sleep(1)
+    resource.release(request)
+    assert sink.get_histogram('resource.busy_seconds', resource=repr(resource)).count == 1
+    assert sink.get_utilisation(resource) == pytest.approx(0.75)
+
+def test_resources_are_not_kept_alive(sink):
+    resource = Resource(int)
+    request = Request(int)
+    resource.acquire(request)
+    resource.release(request)
+    name = repr(resource)
+    resource = weakref.ref(resource)
+    gc.collect()
+    assert resource() is None
+    assert json.dumps(sink.snapshot())
+    assert sink.get_histogram('resource.busy_seconds', resource=name).count == 1
+
+def test_queue_depth(initiated_registry, sink):
+    holder = Chord()
+    holder.request(int, True, max_value=1)
+    waiting = [Chord() for _ in range(3)]
+    with holder:
+        for chord in waiting:
+            chord.request(int, True, max_value=1)
+            chord._try_acquire()
+        assert sink.get_gauge('fairness.queue_depth', policy='BestEffortFairness') == 3
+    for chord in waiting:
+        chord.__exit__(None, None, None)
+
+def test_snapshot_and_custom_sink(initiated_registry, request):
+    calls = []
+
+    class Sink(object):
+        def observe(self, name, value, tags):
+            calls.append(name)
+        increment = gauge = observe
+
+    metrics.set_sink(Sink())
+    request.addfinalizer(lambda: metrics.set_sink(None))
+    chord = Chord()
+    chord.request(int, True, max_value=1)
+    with chord:
+        pass
+    assert {'chord.acquire_attempts', 'chord.hold_seconds', 'resource.busy_seconds'} <= set(calls)
+    sink = metrics.enable()
+    metrics.increment('count', 2, kind=[1])
+    assert sink.snapshot()['counters'][0]['value'] == 2
@@ -2,7 +2,10 @@ import pytest
 from chords.request import Request
 from .conftest import DummyResource, DummyPool
 from chords.exceptions import UnsatisfiableRequestError
-from chords.pool import RandomPool, WeightedRandomPool
+from chords.pool import Pool, HashPool, RandomPool, WeightedRandomPool, IndexedPool, _WeightedSampler, FREE, SHARED
+from chords.resource import Resource
+from chords.chord import Chord
+from chords import registry
         
 @pytest.fixture
 def pool():
@@ -83,3 +86,176 @@ def test_weighted_random_desc():
             smallest_number_first += 1
 
     assert smallest_number_first >= 10 and smallest_number_first <= 35
+
+
+class AttributeResource(Resource):
+    def __init__(self, cls, **attributes):
+        Resource.__init__(self, cls)
+        self.__dict__.update(attributes)
+
+    def matches(self, request):
+        return (Resource.matches(self, request) and
+                all(getattr(self, k, None) == v for k, v in request.kwargs.items()))
+
+
+@pytest.fixture
+def indexed_pool():
+    pool = IndexedPool(attributes=['zone', 'kind'])
+    for i in range(30):
+        pool.add(AttributeResource(int, name=i, zone='abc'[i % 3], kind='gpu' if i % 2 else 'cpu'))
+    return pool
+
+
+def test_indexed_pool_find(indexed_pool):
+    result = [x.name for x in indexed_pool.find(Request(int, zone='a', kind='gpu'))]
+    assert result == [3, 9, 15, 21, 27]
+    result = [x.name for x in indexed_pool.find(Request(int, zone='b', kind='gpu', name=7))]
+    assert result == [7]
+    assert len(list(indexed_pool.find(Request(int)))) == 30
+
+def test_indexed_pool_unsatisfiable(indexed_pool):
+    with pytest.raises(UnsatisfiableRequestError):
+        indexed_pool.get(Request(int, zone='d'))
+    with pytest.raises(UnsatisfiableRequestError):
+        indexed_pool.get(Request(int, zone='a', name=1))
+
+def test_indexed_pool_tracks_state(indexed_pool):
+    exclusive = Request(int, True, zone='a', kind='gpu')
+    shared = Request(int, False, zone='a', kind='gpu')
+    held = []
+    for _ in range(5):
+        resource = indexed_pool.get(exclusive)
+        resource.acquire(exclusive)
+        held.append(resource)
+    assert indexed_pool.get(exclusive) is None
+    assert indexed_pool.get(shared) is None
+
+    held[0].release(exclusive)
+    held[0].acquire(shared)
+    assert indexed_pool.get(exclusive) is None
+    assert indexed_pool.get(shared) is held[0]
+    held[0].release(shared)
+    assert indexed_pool.get(exclusive) is held[0]
+
+def test_indexed_pool_remove(indexed_pool):
+    resource = indexed_pool.get(Request(int, zone='a', name=3))
+    indexed_pool.remove(resource)
+    with pytest.raises(UnsatisfiableRequestError):
+        indexed_pool.get(Request(int, zone='a', name=3))
+    assert len(indexed_pool.all()) == 29
+
+def test_exhausted_pool_skips_held_resources(pool):
+    req = Request(int, True)
+    for resource in pool.all():
+        resource.acquire(req)
+    calls = []
+    for resource in pool.all():
+        resource.matches = lambda request, matches=resource.matches: calls.append(True) or matches(request)
+    assert pool.get(req) is None
+    del calls[:]
+    assert pool.get(req) is None
+    assert pool.get(Request(int, False)) is None
+    assert calls == []
+
+    pool.all()[3].release(req)
+    assert pool.get(req).get_value() == 4
+    assert len(calls) == 1
+
+def test_shared_resources_available_for_shared_requests(pool):
+    shared = Request(int, False, max_value=1)
+    resource = pool.get(shared)
+    resource.acquire(shared)
+    assert pool.get(shared) is resource
+    assert pool.get(Request(int, True, max_value=1)) is None
+
+def test_find_many(pool):
+    taken = set()
+    first = pool.find_many(Request(int, True, max_value=5), 3, taken)
+    assert [x.get_value() for x in first] == [1, 2, 3]
+    second = pool.find_many(Request(int, True, max_value=5), 3, taken)
+    assert [x.get_value() for x in second] == [4, 5]
+    assert taken == set(id(x) for x in first + second)
+
+def test_weighted_random_zero_scores():
+    pool = WeightedRandomPool()
+    pool._resources = [DummyResource(int, i) for i in range(1, 100)]
+    result = [x.get_value() for x in pool.find(Request(int, min_value=5, max_value=10, score_method=lambda i: 0))]
+    assert result == [5, 6, 7, 8, 9, 10]
+
+def test_weighted_random_keeps_score_method():
+    pool = WeightedRandomPool()
+    pool._resources = [DummyResource(int, i) for i in range(1, 100)]
+    request = Request(int, min_value=5, max_value=10, score_method=lambda i: 1 if i.get_value() == 7 else 0)
+    for _ in range(3):
+        assert next(pool.find(request)).get_value() == 7
+
+def test_weighted_sampler_draws_each_once():
+    weights = [0, 3, 0.5, 0, 10, 1e-9, 2] * 50
+    sampler = _WeightedSampler(weights)
+    drawn = [sampler.pop() for _ in weights]
+    assert sorted(drawn) == list(range(len(weights)))
+    zero_indexes = [i for i, weight in enumerate(weights) if weight == 0]
+    assert drawn[-len(zero_indexes):] == zero_indexes
+
+def test_full_resources_are_busy():
+    pool = Pool()
+    slots = Resource(int, capacity=4)
+    pool.add(slots)
+    request = Request(int, False, units=3)
+    slots.acquire(request)
+    assert pool.get(Request(int, False, units=2)) is None
+    assert pool.get(Request(int, False)) is slots
+    slots.acquire(Request(int, False))
+    assert pool._available[FREE].find({}) == [] and pool._available[SHARED].find({}) == []
+    slots.release(request)
+    assert pool.get(Request(int, False, units=2)) is slots
+
+@pytest.mark.parametrize('pool_class', [Pool, WeightedRandomPool])
+def test_units_over_capacity_are_unsatisfiable(pool_class):
+    pool = pool_class()
+    resource = Resource(int, capacity=4)
+    pool.add(resource)
+    assert pool.get(Request(int, units=4)) is resource
+    with pytest.raises(UnsatisfiableRequestError):
+        pool.get(Request(int, units=5))
+    assert pool.get(Request(int, True)) is resource
+    resource.set_capacity(8)
+    assert pool.get(Request(int, units=5)) is resource
+
+
+def test_pool_without_init():
+    class BarePool(Pool):
+        def __init__(self):
+            self._resources = [DummyResource(int, 1)]
+
+    pool = BarePool()
+    assert pool.lock is pool.lock
+    registry.register(int, pool)
+    try:
+        chord = Chord()
+        chord.request(int, True)
+        assert chord.acquire()
+        assert chord.get(int).get_value() == 1
+        chord.release()
+    finally:
+        registry.unregister(int)
+
+
+def test_hash_pool_replaces_resource_with_same_key():
+    pool = HashPool(key=lambda resource: 'k')
+    first, second = Resource(int), Resource(int)
+    pool.add(first)
+    pool.add(second)
+    assert list(pool) == [second]
+    assert list(pool.find(Request(int))) == [second]
+    assert first._pool is None
+
+def test_resource_no_longer_matching_after_release(pool):
+    request = Request(int, True, max_value=1)
+    resource = pool.get(request)
+    resource.acquire(request)
+    assert pool.get(request) is None
+    resource._value = 50
+    resource.release(request)
+    with pytest.raises(UnsatisfiableRequestError):
+        pool.get(request)
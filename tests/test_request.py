@@ -0,0 +1,48 @@
+import pytest
+from chords.request import Request
+
+
+def test_kwargs_as_attributes():
+    request = Request(int, True, max_value=5)
+    assert request.cls is int
+    assert request.is_exclusive()
+    assert request.max_value == 5
+    assert request.min_value is None
+
+def test_kwargs_are_frozen():
+    request = Request(int, max_value=5)
+    with pytest.raises(TypeError):
+        request.kwargs['max_value'] = 6
+    with pytest.raises(TypeError):
+        request.kwargs.pop('max_value')
+    assert request.kwargs == {'max_value': 5}
+
+def test_equality_ignores_kwargs_order():
+    assert Request(int, a=1, b=2) == Request(int, b=2, a=1)
+    assert hash(Request(int, a=1, b=2)) == hash(Request(int, b=2, a=1))
+    assert Request(int, a=1) != Request(int, a=2)
+    assert Request(int, a=1) != Request(float, a=1)
+
+def test_score_method_is_not_matched():
+    score_method = lambda resource: 1
+    request = Request(int, max_value=5, score_method=score_method)
+    assert request.score_method is score_method
+    assert 'score_method' not in request.kwargs
+    assert request == Request(int, max_value=5)
+
+def test_hash_includes_values():
+    hashes = set(hash(Request(int, name=str(i))) for i in range(100))
+    assert len(hashes) > 90
+
+def test_hash_unhashable_values():
+    request = Request(int, names=['a', 'b'], tags={'x': [1]})
+    assert hash(request) == hash(Request(int, tags={'x': [1]}, names=['a', 'b']))
+    assert hash(request) != hash(Request(int, names=['a', 'c'], tags={'x': [1]}))
+    assert request in set([Request(int, names=['a', 'b'], tags={'x': [1]})])
+
+def test_kwargs_built_on_first_use():
+    request = Request(int, b=2, a=1)
+    assert request._kwargs is None
+    assert request.a == 1
+    assert request.kwargs == {'a': 1, 'b': 2}
+    assert request.kwargs is request.kwargs
@@ -76,3 +76,57 @@ def test_fail_release_shared_acquire_exclusive(resource):
     with pytest.raises(UnsatisfiedResourcesError):
         resource.release(Request(int, False))
 
+
+def test_release_equal_shared_requests(resource):
+    first, second = Request(int, False, name='a'), Request(int, False, name='a')
+    resource.acquire(first)
+    resource.acquire(second)
+    resource.release(first)
+    assert resource.is_shared()
+    resource.release(second)
+    assert not resource.is_shared()
+    with pytest.raises(UnsatisfiedResourcesError):
+        resource.release(first)
+
+def test_fail_release_other_request(resource):
+    resource.acquire(Request(int, False, name='a'))
+    with pytest.raises(UnsatisfiedResourcesError):
+        resource.release(Request(int, False, name='b'))
+    assert resource.is_shared()
+
+def test_capacity(resource):
+    resource.set_capacity(2)
+    first, second = Request(int, False), Request(int, False)
+    resource.acquire(first)
+    resource.acquire(second)
+    assert resource.is_full()
+    assert not resource.can_acquire(Request(int, False))
+    with pytest.raises(UnsatisfiedResourcesError):
+        resource.acquire(Request(int, False))
+    resource.release(first)
+    assert not resource.is_full()
+    assert resource.can_acquire(Request(int, False))
+
+def test_units(resource):
+    resource.set_capacity(4)
+    big, small = Request(int, False, units=3), Request(int, False, units=2)
+    resource.acquire(big)
+    assert not resource.is_full()
+    assert resource.get_used_units() == 3
+    assert not resource.can_acquire(small)
+    assert resource.can_acquire(Request(int, False))
+    with pytest.raises(UnsatisfiedResourcesError):
+        resource.acquire(small)
+    resource.release(big)
+    resource.acquire(small)
+    resource.acquire(small)
+    assert resource.is_full()
+    assert resource.get_used_units() == 4
+
+def test_units_are_not_matched():
+    request = Request(int, False, units=2, max_value=3)
+    assert request.units == 2
+    assert request.kwargs == {'max_value': 3}
+    assert request != Request(int, False, max_value=3)
+    with pytest.raises(ValueError):
+        Request(int, False, units=0)
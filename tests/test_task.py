@@ -1,6 +1,8 @@
-import pytest, waiting
-from chords.task import requires, Task
-from chords.chord import Chord
+import sys, time, pytest, waiting
+from chords.task import requires, task, Task, TaskPool
+from chords.request import Request
+from chords.chord import Chord, get_deadline
+from chords.exceptions import AcquireTimeoutError
 
 @pytest.mark.parametrize('exclusive', [True, False])
 def test_decorator(initiated_registry, exclusive):
@@ -77,6 +79,55 @@ def test_decorator_sleeps_until_free(initiated_registry, exclusive):
     assert has_run
     assert not other.is_satisfied()
 
+def test_decorator_priority(initiated_registry):
+    priorities = []
+
+    @task(priority=1)
+    @requires(int, max_value=1, priority=3)
+    @requires(float, max_value=1)
+    def run(resources):
+        priorities.append(resources.get_priority())
+
+    run()
+    assert priorities == [3]
+    assert 'priority' not in run._requirements[0].kwargs
+
+def test_decorator_timeout(initiated_registry):
+    holder = Chord()
+    holder.request(int, True, max_value=1)
+    assert holder.acquire()
+
+    @task(timeout=0.01)
+    @requires(int, True, max_value=1)
+    def run():
+        pass
+
+    with pytest.raises(AcquireTimeoutError):
+        run()
+    holder.release()
+    run()
+
+def test_decorator_deadline_limits_subtasks(initiated_registry):
+    holder = Chord()
+    holder.request(int, True, max_value=1)
+    assert holder.acquire()
+
+    @requires(int, True, max_value=1)
+    def subtask():
+        pass
+
+    @task(deadline=0.05)
+    @requires(float, True, max_value=1)
+    def run():
+        assert get_deadline() is not None
+        subtask()
+
+    start = time.time()
+    with pytest.raises(AcquireTimeoutError):
+        run()
+    assert time.time() - start < 1
+    holder.release()
+
 def test_task_with_no_params(initiated_registry):
     has_run = []
 
@@ -121,3 +172,47 @@ def test_subtask(initiated_registry):
 
     TestTask().start()
     assert len(has_run) == 4
+
+def test_arguments_introspected_once(initiated_registry, monkeypatch):
+    task_module = sys.modules['chords.task']
+    calls = []
+    getargspec = task_module._getargspec
+    monkeypatch.setattr(task_module, '_getargspec', lambda func: calls.append(func) or getargspec(func))
+
+    @requires(int, False, max_value=1)
+    def run(resources):
+        return resources.get(int).get_value()
+
+    assert [run() for _ in range(3)] == [1, 1, 1]
+    assert len(calls) == 1
+
+
+def test_task_pool_evicts_least_recently_used(timeline):
+    pool = TaskPool(max_size=2)
+    for name in ('a', 'b', 'c'):
+        pool.add(name)
+        timeline.sleep(1)
+    assert sorted(pool._resources) == ['b', 'c']
+    pool.get(Request(Task, key='b'))
+    pool.add('d')
+    assert sorted(pool._resources) == ['b', 'd']
+    assert pool.get_stats() == dict(size=2, evictions=2)
+
+def test_task_pool_keeps_held_tasks(timeline):
+    pool = TaskPool(max_size=1)
+    request = Request(Task, True, key='a')
+    pool.get(request).acquire(request)
+    pool.add('b')
+    assert sorted(pool._resources) == ['a', 'b']
+    pool._resources['a'].release(request)
+    pool.add('c')
+    assert sorted(pool._resources) == ['c']
+
+def test_task_pool_evicts_idle_tasks(timeline):
+    pool = TaskPool(idle_seconds=10)
+    pool.add('a')
+    timeline.sleep(5)
+    pool.add('b')
+    timeline.sleep(5)
+    pool.add('c')
+    assert sorted(pool._resources) == ['b', 'c']
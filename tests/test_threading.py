@@ -0,0 +1,85 @@
+import threading, time
+import pytest
+ThreadPoolExecutor = pytest.importorskip('concurrent.futures').ThreadPoolExecutor
+from chords.chord import Chord
+from chords.task import requires, task
+
+THREADS = 8
+ITERATIONS = 50
+
+
+class HoldersTracker(object):
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.holders = {}
+        self.violations = []
+
+    def enter(self, resources):
+        with self._lock:
+            for resource in resources:
+                value = resource.get_value()
+                if self.holders.get(value):
+                    self.violations.append(value)
+                self.holders[value] = True
+
+    def exit(self, resources):
+        with self._lock:
+            for resource in resources:
+                self.holders[resource.get_value()] = False
+
+
+def test_exclusive_stress(initiated_registry, condition_waiter):
+    tracker = HoldersTracker()
+
+    def worker():
+        for _ in range(ITERATIONS):
+            chord = Chord()
+            chord.request(int, True, max_value=3)
+            chord.request(int, True, max_value=3)
+            chord.request(float, False, max_value=1)
+            with chord:
+                ints = chord.find(int)
+                tracker.enter(ints)
+                tracker.exit(ints)
+
+    with ThreadPoolExecutor(THREADS) as executor:
+        for future in [executor.submit(worker) for _ in range(THREADS)]:
+            future.result(timeout=30)
+    assert tracker.violations == []
+    assert not any(tracker.holders.values())
+    for resource in initiated_registry.get_pool(int):
+        assert not resource.is_exclusive() and not resource.is_shared()
+
+
+def test_tasks_from_thread_pool(initiated_registry, condition_waiter):
+    tracker = HoldersTracker()
+
+    @requires(int, True, max_value=1)
+    def run(resources):
+        tracker.enter(resources.find(int))
+        tracker.exit(resources.find(int))
+        return True
+
+    with ThreadPoolExecutor(THREADS) as executor:
+        futures = [executor.submit(run) for _ in range(THREADS * ITERATIONS)]
+        assert all(future.result(timeout=30) for future in futures)
+    assert tracker.violations == []
+
+def test_task_max_concurrency(condition_waiter):
+    lock = threading.Lock()
+    running = [0]
+    most_running = [0]
+
+    @task(max_concurrency=3)
+    def limited():
+        with lock:
+            running[0] += 1
+            most_running[0] = max(most_running[0], running[0])
+        time.sleep(0.001)
+        with lock:
+            running[0] -= 1
+
+    with ThreadPoolExecutor(THREADS) as executor:
+        for future in [executor.submit(limited) for _ in range(THREADS * 10)]:
+            future.result(timeout=30)
+    assert most_running[0] == 3
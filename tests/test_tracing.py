@@ -0,0 +1,42 @@
+import logging
+import pytest
+from chords import tracing
+from chords.chord import Chord
+
+
+@pytest.fixture
+def events(request):
+    events = []
+    tracing.set_tracer(lambda event, fields: events.append((event, fields)))
+    request.addfinalizer(lambda: tracing.set_tracer(None))
+    return events
+
+
+def test_disabled_by_default():
+    assert not tracing.enabled()
+
+def test_tracer_gets_events(initiated_registry, events):
+    chord = Chord()
+    chord.request(int, True, max_value=1)
+    with chord:
+        pass
+    assert [event for event, _ in events][:3] == ['found', 'acquire', 'release']
+    assert all(fields['chord'] is chord for event, fields in events if event in ('acquire', 'release'))
+
+def test_tracer_not_found(initiated_registry, events):
+    chord = Chord()
+    chord.request(int, True, max_value=1)
+    other = Chord()
+    other.request(int, True, max_value=1)
+    with chord:
+        assert not other.acquire()
+    assert ('not_found', {'chord': other, 'request': other._requests[0]}) in events
+
+def test_debug_logging(initiated_registry, caplog):
+    chord = Chord()
+    chord.request(int, True, max_value=1)
+    with caplog.at_level(logging.DEBUG, logger='Chords'):
+        assert tracing.enabled()
+        with chord:
+            pass
+    assert any(record.getMessage().startswith('Release ') for record in caplog.records)
@@ -0,0 +1,73 @@
+import threading, time
+import pytest
+from chords import waiters
+from chords.chord import Chord
+
+
+def _enter_in_thread(chord, entered):
+    def run():
+        with chord:
+            entered.append(chord.get(int).get_value())
+    thread = threading.Thread(target=run)
+    thread.daemon = True
+    thread.start()
+    return thread
+
+
+def test_condition_waiter_wakes_on_release(initiated_registry, condition_waiter):
+    other = Chord()
+    other.request(int, True, max_value=1)
+    assert other.acquire()
+
+    chord = Chord()
+    chord.request(int, True, max_value=1)
+    attempts = []
+    orig_try_acquire = chord._try_acquire
+    def counting_try_acquire():
+        attempts.append(True)
+        return orig_try_acquire()
+    chord._try_acquire = counting_try_acquire
+
+    entered = []
+    thread = _enter_in_thread(chord, entered)
+    time.sleep(0.2)
+    assert not entered
+    assert len(attempts) == 1, "Chord should sleep until notified"
+
+    other.release()
+    thread.join(5)
+    assert entered == [1]
+    assert not chord.is_satisfied()
+
+
+def test_condition_waiter_wakes_chord_acquired_by_other(initiated_registry, condition_waiter):
+    other = Chord()
+    other.request(int, True, max_value=1)
+    assert other.acquire()
+
+    entered = []
+    threads = []
+    for _ in range(3):
+        chord = Chord()
+        chord.request(int, True, max_value=1)
+        threads.append(_enter_in_thread(chord, entered))
+    time.sleep(0.1)
+    assert not entered
+
+    other.release()
+    for thread in threads:
+        thread.join(5)
+    assert entered == [1, 1, 1]
+
+
+@pytest.mark.parametrize('waiter', [waiters.PollingWaiter(sleep_seconds=0.001), waiters.ConditionWaiter()])
+def test_waiter_timeout(waiter):
+    attempts = []
+    def predicate():
+        attempts.append(True)
+        return False
+    start = time.time()
+    assert not waiter.wait(predicate, timeout_seconds=0.02)
+    assert time.time() - start >= 0.02
+    assert attempts
+    assert waiter.wait(lambda: True, timeout_seconds=0)